@@ -0,0 +1,63 @@
+import sys
+import time
+import argparse
+import tracemalloc
+
+from validium import config
+
+from .scenarios import scenarios
+
+
+def measure(scenario, latency, size):
+    run, fake = scenario(latency, size)
+    before = fake.commands
+    start = time.perf_counter()
+    run()
+    wall = time.perf_counter() - start
+    trips = fake.commands - before
+
+    run, fake = scenario(0, size)
+    tracemalloc.start()
+    try:
+        run()
+        current, peak = tracemalloc.get_traced_memory()
+        blocks = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+    finally:
+        tracemalloc.stop()
+    return trips, wall, peak, blocks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+        description="Run validium's hot paths against a fake WebDriver.")
+    parser.add_argument("-l", "--latency", type=float, default=0.001,
+        help="seconds of simulated latency per WebDriver command")
+    parser.add_argument("-n", "--size", type=int, default=50,
+        help="number of items in each scenario's document")
+    parser.add_argument("-p", "--profile", default=config.profile,
+        choices=("debug", "fast"), help="validium execution profile")
+    parser.add_argument("-k", "--select", default="",
+        help="only run scenarios whose name contains this string")
+    args = parser.parse_args(argv)
+    config.profile = args.profile
+
+    header = ("scenario", "round trips", "wall ms", "peak KiB", "live blocks")
+    print("%-22s %12s %10s %10s %12s" % header)
+    failed = False
+    for scenario in scenarios:
+        name = scenario.__name__
+        if args.select not in name:
+            continue
+        try:
+            trips, wall, peak, blocks = measure(scenario, args.latency, args.size)
+        except Exception as e:
+            failed = True
+            print("%-22s error: %s: %s" % (name, type(e).__name__, e))
+        else:
+            print("%-22s %12d %10.1f %10.1f %12d" % (
+                name, trips, wall * 1000, peak / 1024, blocks))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+import re
+import time
+import pkgutil
+import itertools
+import xml.etree.ElementTree as ET
+from selenium.webdriver import Remote
+
+
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+
+class CommandError(Exception):
+
+    def __init__(self, error, message):
+        super().__init__(message)
+        self.error = error
+
+
+class executor:
+
+    def __init__(self, pages, latency=0.0):
+        self.pages, self.latency = pages, latency
+        self.commands = 0
+        self.scripts = dict(SCRIPTS)
+        self._ids = itertools.count()
+        self._atoms = None
+        self.load("about:blank")
+
+    def load(self, url):
+        self.url = url
+        self.root = ET.fromstring(self.pages.get(url, "<html><body/></html>"))
+        self.parents = {c: p for p in self.root.iter() for c in p}
+        self.elements, self.references = {}, {}
+
+    def reference(self, el):
+        if id(el) not in self.references:
+            ref = "e%d" % next(self._ids)
+            self.references[id(el)] = ref
+            self.elements[ref] = el
+        return {ELEMENT_KEY: self.references[id(el)]}
+
+    def element(self, value):
+        ref = value[ELEMENT_KEY] if isinstance(value, dict) else value
+        if ref not in self.elements:
+            raise CommandError("stale element reference",
+                "%s is not attached to the document" % ref)
+        return self.elements[ref]
+
+    def find(self, context, using, value):
+        if using != "xpath":
+            raise CommandError("invalid selector", "only xpath is supported")
+        if value.startswith(("//", "(//")):
+            context, value = self.root, value.replace("//", ".//", 1)
+        if value.startswith("("):
+            end = _closing(value)
+            match = re.match(r"^\[(\d+)\]", value[end + 1:])
+            found = self.find(context, using, value[1:end])
+            rest = value[end + 1:]
+            if match:
+                n = int(match.group(1))
+                found, rest = found[n - 1:n], rest[match.end():]
+            if rest.startswith("/"):
+                # compiled locators continue below the anchored element
+                return [el for f in found for el in
+                    self.find(f, using, rest[1:])]
+            return found
+        match = re.match(r"^(.*)\[position\(\) > (\d+)"
+            r"(?: and position\(\) <= (\d+))?\]$", value)
+        if match:
+            stop = match.group(3) and int(match.group(3))
+            return self._findall(context, match.group(1))[int(match.group(2)):stop]
+        return self._findall(context, value)
+
+    def _findall(self, context, value):
+        if value == ".":
+            return [context]
+        elif value == "..":
+            return [self.parents[context]]
+        try:
+            return context.findall(value)
+        except SyntaxError as e:
+            raise CommandError("invalid selector", str(e))
+
+    def text(self, el):
+        return " ".join("".join(el.itertext()).split())
+
+    def execute(self, command, params):
+        self.commands += 1
+        if self.latency:
+            time.sleep(self.latency)
+        handler = getattr(self, "_" + command, None)
+        try:
+            value = handler(params) if handler is not None else None
+        except CommandError as e:
+            return {"status": e.error, "value": {"error": e.error, "message": str(e)}}
+        return {"status": 0, "value": value}
+
+    def _newSession(self, params):
+        return {"sessionId": "fake-%s" % id(self), "capabilities": {}}
+
+    def _get(self, params):
+        self.load(params["url"])
+
+    def _getCurrentUrl(self, params):
+        return self.url
+
+    def _refresh(self, params):
+        self.load(self.url)
+
+    def _context(self, params):
+        return self.element(params["id"]) if "id" in params else self.root
+
+    def _findElement(self, params):
+        found = self.find(self._context(params), params["using"], params["value"])
+        if not found:
+            raise CommandError("no such element", params["value"])
+        return self.reference(found[0])
+
+    _findChildElement = _findElement
+
+    def _findElements(self, params):
+        found = self.find(self._context(params), params["using"], params["value"])
+        return [self.reference(el) for el in found]
+
+    _findChildElements = _findElements
+
+    def _getElementText(self, params):
+        return self.text(self.element(params["id"]))
+
+    def _getElementAttribute(self, params):
+        return self.element(params["id"]).get(params["name"])
+
+    def _getElementProperty(self, params):
+        return self.element(params["id"]).get(params["name"])
+
+    def _isElementDisplayed(self, params):
+        return self.element(params["id"]).get("hidden") is None
+
+    def _isElementEnabled(self, params):
+        return self.element(params["id"]).get("disabled") is None
+
+    def _clickElement(self, params):
+        el = self.element(params["id"])
+        if el.get("data-append"):
+            # a "load more" control appends copies of its target's last child
+            target = self.root.find(".//*[@id='%s']" % el.get("data-append"))
+            for i in range(int(el.get("data-count", "1"))):
+                clone = ET.fromstring(ET.tostring(target[-1]))
+                clone.text = "item %s" % len(target)
+                target.append(clone)
+                self.parents[clone] = target
+        elif el.get("href"):
+            self.load(el.get("href"))
+
+    def _sendKeysToElement(self, params):
+        el = self.element(params["id"])
+        el.set("value", (el.get("value") or "") + params["text"])
+
+    def _w3cExecuteScript(self, params):
+        script = params["script"]
+        args = [self.element(a) if isinstance(a, dict) and ELEMENT_KEY in a
+            else a for a in params["args"]]
+        atoms = self.atoms()
+        if atoms.get("getAttribute", script + ".") in script:
+            return args[0].get(args[1])
+        elif atoms.get("isDisplayed", script + ".") in script:
+            return args[0].get("hidden") is None
+        elif "getBoundingClientRect" in script:
+            return {"x": 0, "y": 0, "width": 0, "height": 0}
+        for marker, emulation in self.scripts.items():
+            if marker in script:
+                return emulation(self, *args)
+        return None
+
+    _w3cExecuteScriptAsync = _w3cExecuteScript
+    _executeScript = _w3cExecuteScript
+
+    def atoms(self):
+        if self._atoms is None:
+            self._atoms = {}
+            for name in ("getAttribute", "isDisplayed"):
+                try:
+                    atom = pkgutil.get_data("selenium.webdriver.remote",
+                        "%s.js" % name).decode("utf8")
+                except (OSError, TypeError):
+                    continue
+                self._atoms[name] = atom
+        return self._atoms
+
+
+def _closing(value):
+    depth = 0
+    for i, c in enumerate(value):
+        depth += {"(": 1, ")": -1}.get(c, 0)
+        if depth == 0:
+            return i
+
+
+def _snapshot(fake, root, spec):
+    found = []
+    for el in fake.find(root, spec["method"], spec["selector"]):
+        item = spec if spec["recursive"] else spec["item"]
+        found.append({"text": fake.text(el),
+            "attributes": {a: el.get(a) for a in spec["attributes"]},
+            "items": _snapshot(fake, el, item) if item else None})
+    return found
+
+
+def _fingerprint(fake, root, spec):
+    found = []
+    for el in fake.find(root, spec["method"], spec["selector"]):
+        text = fake.text(el) + "".join("\0%s" % ("null" if el.get(a) is None
+            else el.get(a)) for a in spec["attributes"])
+        code = text.encode("utf-16-le")
+        h = 5381
+        for i in range(0, len(code), 2):
+            h = (h * 33 + int.from_bytes(code[i:i + 2], "little")) & 0xFFFFFFFF
+        found.append(h - (1 << 32) if h & 0x80000000 else h)
+    return found
+
+
+def _check(fake, root, spec):
+    if spec["kind"] == "url":
+        return fake.url if re.match("(?:%s)" % spec["pattern"], fake.url) else None
+    found = fake.find(root if root is not None else fake.root,
+        spec["method"], spec["selector"])
+    if not found:
+        return None
+    el = found[0]
+    if spec["kind"] == "text":
+        text = fake.text(el)
+        if not (spec["value"] in text if spec["contains"] else text == spec["value"]):
+            return None
+    elif spec["kind"] == "attribute":
+        value = el.get(spec["name"])
+        if not (value is not None if spec["value"] is None else value == spec["value"]):
+            return None
+    return fake.reference(el)
+
+
+def _checks(fake, roots, specs):
+    roots = [fake.element(r) if r is not None else None for r in roots]
+    checked = []
+    for root, spec in zip(roots, specs):
+        value = _check(fake, root, spec)
+        checked.append([(value is None) == bool(spec["inverse"]), value])
+    return checked
+
+
+def _perform(fake, steps):
+    errors = []
+    for step in steps:
+        if any(errors):
+            errors.append(False)
+            continue
+        target = step["target"]
+        if "element" in target:
+            el = fake.element(target["element"])
+        else:
+            el = fake.root
+            for method, selector in target["steps"]:
+                found = fake.find(el, method, selector)
+                el = found[0] if found else None
+                if el is None:
+                    break
+        if el is None:
+            errors.append("no element found")
+            continue
+        if step["action"] == "click":
+            fake._clickElement({"id": fake.reference(el)[ELEMENT_KEY]})
+        elif step["action"] == "keys":
+            el.set("value", (el.get("value") or "") + step["value"])
+        elif step["action"] == "value":
+            el.set("value", step["value"])
+        errors.append(None)
+    return errors
+
+
+SCRIPTS = {"function snapshot(": _snapshot, "function fingerprint(": _fingerprint,
+    "function checks(": _checks, "function perform(": _perform}
+
+
+def remote(pages, latency=0.0, url=None):
+    fake = executor(pages, latency)
+    try:
+        from selenium.webdriver.common.options import ArgOptions
+    except ImportError:
+        driver = Remote(command_executor=fake, desired_capabilities={})
+    else:
+        driver = Remote(command_executor=fake, options=ArgOptions())
+    if url is not None:
+        fake.load(url)
+    fake.commands = 0
+    return driver, fake
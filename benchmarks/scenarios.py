@@ -0,0 +1,223 @@
+import time
+
+from validium import *
+
+from .fake import remote
+
+
+HOST = "http://bench"
+
+
+def _list(n, tag="ul", id="list"):
+    items = "".join("<li>item %s</li>" % i for i in range(n))
+    return "<%s id='%s'>%s</%s>" % (tag, id, items, tag)
+
+
+def _table(rows, cols):
+    cells = lambda r: "".join("<td>%s.%s</td>" % (r, c) for c in range(cols))
+    body = "".join("<tr>%s</tr>" % cells(r) for r in range(rows))
+    return "<table id='grid'>%s</table>" % body
+
+
+def _nested(depth, width):
+    if not depth:
+        return "<span>leaf</span>"
+    inner = "".join(_nested(depth - 1, width) for i in range(width))
+    return "<div class='level%s'>%s</div>" % (depth, inner)
+
+
+def _document(body):
+    return "<html><body>%s</body></html>" % body
+
+
+class listing(page):
+    url = HOST + "/list"
+
+    class entries(container):
+        selector = "//ul[@id='list']"
+
+
+class lookup(page):
+    url = HOST + "/list"
+
+    class entries(mapping):
+        selector = "//ul[@id='list']"
+
+
+class grid(page):
+    url = HOST + "/grid"
+
+    class rows(table):
+        selector = "//table[@id='grid']"
+
+
+class navigation(page):
+    url = HOST + "/list"
+
+    class sidebar(menu):
+        selector = "//ul[@id='list']"
+        always_displayed = True
+
+
+class cascade(page):
+    url = HOST + "/nested"
+
+    class outer(view):
+        selector = "//div[@class='level3']"
+
+        class middle(view):
+            selector = "./div[1]"
+
+            class inner(view):
+                selector = "./div[1]"
+
+                class leaf(view):
+                    selector = "./span[1]"
+
+        class sibling(view):
+            selector = "./div[2]"
+
+
+class feed(page):
+    url = HOST + "/feed"
+
+    class more(button):
+        selector = "//button[@id='more']"
+
+    class entries(infinite_container):
+        selector = "//ul[@id='feed']"
+
+        def load(self):
+            self.page.more.click()
+
+        def loading(self):
+            return False
+
+
+class signup(page):
+    url = HOST + "/signup"
+
+    class name(field):
+        selector = "//input[@id='name']"
+
+    class email(field):
+        selector = "//input[@id='email']"
+
+    class agree(button):
+        selector = "//input[@id='agree']"
+
+    class submit(button):
+        selector = "//button[@id='submit']"
+
+
+def _setup(pages, latency, page):
+    pages = {HOST + path: _document(body) for path, body in pages.items()}
+    driver, fake = remote(pages, latency, page.url)
+    return page(driver), fake
+
+
+def container_iteration(latency, size):
+    p, fake = _setup({"/list": _list(size)}, latency, listing)
+    return lambda : [i.text for i in p.entries], fake
+
+
+def container_slice(latency, size):
+    p, fake = _setup({"/list": _list(size)}, latency, listing)
+    return lambda : [i.text for i in p.entries[:10]], fake
+
+
+def mapping_keys(latency, size):
+    p, fake = _setup({"/list": _list(size)}, latency, lookup)
+    return lambda : list(p.entries.keys()), fake
+
+
+def table_cells(latency, size):
+    p, fake = _setup({"/grid": _table(size, 10)}, latency, grid)
+    def run():
+        rows = p.rows
+        return [[c.text for c in rows[r].values()] for r in rows]
+    return run, fake
+
+
+def mapping_snapshot(latency, size):
+    p, fake = _setup({"/grid": _table(size, 10)}, latency, grid)
+    return lambda : p.rows.snapshot(), fake
+
+
+def dashboard_update(latency, size):
+    p, fake = _setup({"/grid": _table(size, 10)}, latency, grid)
+    rows = p.rows
+    rows.update()
+    ticks = iter(range(1, 1 << 30))
+    def run():
+        # a couple of cells change between polls
+        tick = next(ticks)
+        table = fake.root.find(".//table")
+        for r in (tick % size, (tick * 7) % size):
+            table[r][0].text = "tick %s" % tick
+        return [c.item.text for c in rows.update() if c.item is not None]
+    return run, fake
+
+
+def menu_select(latency, size):
+    p, fake = _setup({"/list": _list(size)}, latency, navigation)
+    return lambda : p.sidebar.select("item %s" % (size - 1)), fake
+
+
+def refresh_cascade(latency, size):
+    p, fake = _setup({"/nested": _nested(3, 2)}, latency, cascade)
+    outer = p.outer
+    def run():
+        for i in range(size // 10 or 1):
+            outer.middle.inner.leaf.text
+            outer.sibling.text
+            outer.refresh()
+    return run, fake
+
+
+def wait_until(latency, size):
+    fake = remote({}, latency)[1]
+    def run():
+        ready = time.monotonic() + 0.05
+        return Wait(1).until(lambda : time.monotonic() > ready, "to be ready")
+    return run, fake
+
+
+def wait_many(latency, size):
+    body = "<div id='a'/><div id='b' class='ready'/>" + _list(size)
+    p, fake = _setup({"/list": body}, latency, listing)
+    driver = p.driver
+    conditions = {"a": observe.present(driver, ("xpath", "//div[@id='a']")),
+        "b": observe.attribute(driver, ("xpath", "//div[@id='b']"), "class", "ready"),
+        "spinner": observe.absent(driver, ("xpath", "//div[@id='spinner']"))}
+    return lambda : Wait(1).until_all(conditions), fake
+
+
+def form_fill(latency, size):
+    body = ("<form><input id='name'/><input id='email'/><input id='agree'/>"
+        "<button id='submit'>submit</button></form>")
+    p, fake = _setup({"/signup": body}, latency, signup)
+    def run():
+        with p.batch() as b:
+            b.set_value(p.name, "jane").set_value(p.email, "jane@example.com")
+            b.click(p.agree).click(p.submit)
+        return b
+    return run, fake
+
+
+def infinite_scroll(latency, size):
+    body = "<button id='more' data-append='feed' data-count='10'>more</button>"
+    p, fake = _setup({"/feed": body + _list(10, id="feed")}, latency, feed)
+    def run():
+        seen = []
+        for item in p.entries:
+            seen.append(item)
+            if len(seen) >= size:
+                break
+        return seen
+    return run, fake
+
+
+scenarios = [container_iteration, container_slice, mapping_keys, table_cells,
+    mapping_snapshot, dashboard_update, menu_select, refresh_cascade, wait_until,
+    wait_many, form_fill, infinite_scroll]
@@ -11,7 +11,8 @@ this = os.path.dirname(__file__)
 here = os.path.abspath(this)
 
 project = "validium"
-packages = find_packages(here)
+packages = find_packages(here, exclude=("tests", "tests.*",
+    "benchmarks", "benchmarks.*"))
 
 requirements = os.path.join(here, "requirements.txt")
 with open(requirements, "r") as requirements:
@@ -25,6 +26,7 @@ install = dict(
     name=project,
     packages=packages,
     install_requires=requirements,
+    extras_require={"static": ["lxml", "cssselect"]},
 )
 
 if __name__ == "__main__":
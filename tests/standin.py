@@ -0,0 +1,67 @@
+import re
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from selenium.webdriver.remote.remote_connection import remote_commands
+
+from benchmarks.fake import executor
+
+
+ROUTES = [(method, re.compile("^%s$" % re.sub(r"\$(\w+)", r"(?P<\1>[^/]+)", path)), command)
+    for command, (method, path) in remote_commands.items()]
+
+
+NOT_FOUND = ("no such element", "stale element reference", "unknown command")
+
+
+class standin:
+
+    def __init__(self, pages, url=None):
+        self.browser = executor(pages)
+        if url is not None:
+            self.browser.load(url)
+        handler = type("handler", (_handler,), {"standin": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.url = "http://127.0.0.1:%s" % self.server.server_port
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def dispatch(self, method, path, body):
+        for m, route, command in ROUTES:
+            match = route.match(path)
+            if m == method and match:
+                params = dict(body or {}, **match.groupdict())
+                response = self.browser.execute(command, params)
+                if response["status"]:
+                    error = response["value"]["error"]
+                    return 404 if error in NOT_FOUND else 500, response["value"]
+                return 200, response["value"]
+        return 404, {"error": "unknown command", "message": path}
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _handler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"null")
+        code, value = self.standin.dispatch(self.command, self.path, body)
+        payload = json.dumps({"value": value}).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_DELETE = _respond
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,87 @@
+import time
+import asyncio
+import pytest
+
+from validium import aio
+from validium.errors import Timeout, WebDriverError
+
+from .standin import standin
+
+
+HOST = "http://site"
+PAGES = {HOST + "/list": "<html><body><ul id='list'>"
+    "<li>a</li><li>b</li><li>c</li></ul></body></html>"}
+
+
+class listing(aio.page):
+    url = HOST + "/list"
+
+    class entries(aio.container):
+        selector = "//ul[@id='list']"
+
+    class first(aio.view):
+        selector = "//ul[@id='list']/li[1]"
+
+    class missing(aio.view):
+        selector = "//div[@id='missing']"
+        timeout = 0.3
+
+
+def run(test):
+    with standin(PAGES) as server:
+        async def main():
+            async with aio.session(server.url) as s:
+                return await test(server, s)
+        return asyncio.run(main())
+
+
+def test_session():
+    async def test(server, s):
+        assert s.session_id is not None
+        await s.get(HOST + "/list")
+        assert await s.current_url() == HOST + "/list"
+        await s.quit()
+        assert s.session_id is None
+        await s.start()
+        assert s.session_id is not None
+    run(test)
+
+
+def test_errors():
+    async def test(server, s):
+        with pytest.raises(WebDriverError) as error:
+            await s.find_element("xpath", "//nope")
+        assert error.value.error == "no such element"
+    run(test)
+
+
+def test_wait_timeout():
+    async def test(server, s):
+        p = await listing.open(s)
+        start = time.monotonic()
+        with pytest.raises(Timeout):
+            await p.missing.element()
+        assert time.monotonic() - start < 2
+        assert not await p.missing.exists()
+    run(test)
+
+
+def test_container_enumeration():
+    async def test(server, s):
+        p = await listing.open(s)
+        assert [await i.text() for i in await p.entries.items()] == ["a", "b", "c"]
+        assert [await i.text() async for i in p.entries] == ["a", "b", "c"]
+    run(test)
+
+
+def test_stale_retry():
+    async def test(server, s):
+        p = await listing.open(s)
+        first = p.first
+        assert await first.text() == "a"
+        stale = first._element
+        # a re-render replaces every element in the document
+        server.browser.load(HOST + "/list")
+        assert await first.text() == "a"
+        assert first._element != stale
+    run(test)
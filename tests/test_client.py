@@ -0,0 +1,29 @@
+from validium.client import pool
+
+from benchmarks.fake import remote
+
+from .standin import standin
+
+
+def test_pool_factory():
+    made = []
+    def factory(capabilities):
+        made.append(capabilities)
+        return remote({})[0]
+    p = pool(factory=factory, max_size=1)
+    with p.session("chrome") as d:
+        first = d
+    with p.session("chrome") as d:
+        assert d is first
+    assert len(made) == 1 and made[0]["browserName"] == "chrome"
+    p.close()
+    assert len(p) == 0
+
+
+def test_pool_default_factory():
+    with standin({}) as server:
+        p = pool(server.url)
+        d = p.checkout("chrome")
+        assert d.session_id
+        p.checkin(d)
+        p.close()
@@ -0,0 +1,13 @@
+import shutil
+import subprocess
+import pytest
+
+from validium.tools import _javascript
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="requires node")
+@pytest.mark.parametrize("name", sorted(_javascript))
+def test_syntax(name, tmp_path):
+    script = tmp_path / ("%s.js" % name)
+    script.write_text(_javascript[name])
+    subprocess.run(["node", "--check", str(script)], check=True)
@@ -0,0 +1,52 @@
+import time
+import pytest
+
+from validium import *
+from validium.errors import ReplayError
+from validium.replay import capture, replay
+
+from benchmarks.fake import remote
+
+
+HOST = "http://site"
+
+
+class listing(page):
+    url = HOST + "/list"
+
+    class entries(container):
+        selector = "//ul[@id='list']"
+
+
+class other(page):
+    url = HOST + "/list"
+
+    class entries(container):
+        selector = "//ol[@id='list']"
+
+
+def _record(path):
+    body = "<html><body><ul id='list'><li>a</li><li>b</li></ul></body></html>"
+    driver, fake = remote({listing.url: body}, url=listing.url)
+    capture(driver, path)
+    texts = [i.text for i in listing(driver).entries]
+    driver.command_executor.close()
+    return texts
+
+
+def test_replay(tmp_path):
+    path = tmp_path / "session.jsonl.gz"
+    assert _record(str(path)) == ["a", "b"]
+    driver = replay(str(path))
+    assert [i.text for i in listing(driver).entries] == ["a", "b"]
+    assert driver.command_executor.finished
+
+
+def test_divergence_fails_at_once(tmp_path):
+    path = tmp_path / "session.jsonl"
+    _record(str(path))
+    start = time.monotonic()
+    with pytest.raises(ReplayError, match="Expects command"):
+        with configure(timeout=30):
+            [i.text for i in other(replay(str(path))).entries]
+    assert time.monotonic() - start < 5
@@ -0,0 +1,175 @@
+import pytest
+
+from validium import *
+from validium.errors import ActionError
+from validium.views import NOT_RUN
+
+from benchmarks.fake import remote
+
+
+HOST = "http://site"
+
+
+def _page(body):
+    return "<html><body>%s</body></html>" % body
+
+
+def _list(*texts, id="list"):
+    items = "".join("<li>%s</li>" % t for t in texts)
+    return "<ul id='%s'>%s</ul>" % (id, items)
+
+
+class listing(page):
+    url = HOST + "/list"
+
+    class entries(mapping):
+        selector = "//ul[@id='list']"
+
+
+def _open(cls, body):
+    driver, fake = remote({cls.url: _page(body)}, url=cls.url)
+    return cls(driver), fake
+
+
+def test_mapping_duplicate_keys():
+    p, fake = _open(listing, _list("a", "b", "a", "c"))
+    assert p.entries["c"].text == "c"
+    assert {k: v.text for k, v in p.entries.items()} == {"a": "a", "b": "b", "c": "c"}
+    p.entries.refresh()
+    p.entries._fill()
+    assert p.entries["c"].text == "c"
+    assert p.entries["c"] is p.entries._loaded[3]
+
+
+class feed(page):
+    url = HOST + "/feed"
+
+    class more(button):
+        selector = "//button[@id='more']"
+
+    class entries(container):
+        selector = "//ul[@id='list']"
+
+    class lookup(mapping):
+        selector = "//ul[@id='list']"
+
+
+def test_containers_notice_changes_after_actions():
+    more = "<button id='more' data-append='list' data-count='2'>more</button>"
+    p, fake = _open(feed, more + _list("a", "b"))
+    assert len(list(p.entries)) == 2
+    assert len(p.lookup.keys()) == 2
+    p.more.click()
+    assert len(list(p.entries)) == 4
+    assert len(p.lookup.keys()) == 4
+
+
+class catalog(page):
+    url = HOST + "/catalog"
+
+    class by_id(mapping):
+        selector = "//ul[@id='products']"
+
+        class item(mapping.item):
+            selector = "./li[{}]"
+            key = lambda self: self.attr("data-id")
+
+    class by_name(mapping):
+        selector = "//ul[@id='products']"
+
+        class item(mapping.item):
+            selector = "./li[{}]"
+
+            class name(view):
+                selector = "./b[1]"
+
+            def key(self):
+                return self.name.text
+
+
+def test_snapshot_custom_keys():
+    body = ("<ul id='products'><li data-id='p1'><b>one</b> 1</li>"
+        "<li data-id='p2'><b>two</b> 2</li></ul>")
+    p, fake = _open(catalog, body)
+    assert {k: r.text for k, r in p.by_id.snapshot().items()} == {"p1": "one 1", "p2": "two 2"}
+    assert list(p.by_name.snapshot()) == ["one", "two"]
+    assert p.by_id.snapshot()["p1"].attr("class") is None
+
+
+class stream(page):
+    url = HOST + "/stream"
+
+    class entries(infinite_container):
+        selector = "//ul[@id='list']"
+        timeout = 1
+
+        def load(self):
+            pass
+
+
+def test_infinite_container_default_loading():
+    p, fake = _open(stream, _list("a", "b"))
+    assert [i.text for i in p.entries] == ["a", "b"]
+
+
+class status(page):
+    url = HOST + "/status"
+
+    class panel(view):
+        selector = "//div[@id='panel']"
+
+        class title(view):
+            selector = "./h1[1]"
+
+        class spinner(view):
+            selector = "./span[@class='spinner']"
+
+
+def test_wait_all_on_views():
+    body = "<div id='panel' class='ready'><h1>done</h1></div>"
+    p, fake = _open(status, body)
+    panel = p.panel
+    fake.commands = 0
+    result = wait_all(1, {"title": panel.title.has_text("done"),
+        "ready": panel.has_attribute("class", "ready"),
+        "idle": panel.spinner.absent()})
+    assert result.met == ("title", "ready", "idle")
+    assert fake.commands == 1
+    assert not wait_any(0.1, [panel.title.has_text("other")], default=False)
+
+
+class signup(page):
+    url = HOST + "/signup"
+
+    class name(field):
+        selector = "//input[@id='name']"
+
+    class missing(field):
+        selector = "//input[@id='missing']"
+        timeout = 0.1
+
+    class submit(button):
+        selector = "//button[@id='submit']"
+
+
+SIGNUP = "<form><input id='name'/><button id='submit'>submit</button></form>"
+
+
+def _check_batch_stops(p):
+    b = p.batch().set_value(p.name, "jane").set_value(p.missing, "x").click(p.submit)
+    with pytest.raises(ActionError) as error:
+        b.run()
+    steps = error.value.steps
+    assert [s.ok for s in steps] == [True, False, False]
+    assert steps[2].error == NOT_RUN
+
+
+def test_batch_stops_at_first_error():
+    p, fake = _open(signup, SIGNUP)
+    _check_batch_stops(p)
+
+
+def test_live_batch_stops_at_first_error():
+    static = pytest.importorskip("validium.static")
+    driver = static.document(pages={signup.url: _page(SIGNUP)})
+    _check_batch_stops(signup(driver))
@@ -1,7 +1,9 @@
 from .views import *
-from .client import browser, driver
+from .client import browser, driver, pool
 from .pages import page, redirect
-from .tools import Wait, wait, wait_until_is, wait_until_is_not
+from .flows import executor
+from .tools import (Wait, backoff, configure, observe, wait, wait_all, wait_any,
+    wait_until_is, wait_until_is_not)
 
 
 class node:
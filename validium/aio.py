@@ -0,0 +1,457 @@
+import re
+import json
+import time
+import asyncio
+import inspect
+from functools import partial
+from collections import deque
+from urllib.parse import urlsplit, quote
+
+from . import tools
+from .errors import *
+from .tools import structure, configurable, backoff, new, template
+from .views import XPATH_IDENTIFIERS, general_selector
+
+
+__all__ = ["connection", "session", "element", "Wait", "wait",
+    "page", "view", "container"]
+
+
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+
+class connection:
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        if parts.scheme != "http":
+            raise ValueError("Only http:// WebDriver endpoints "
+                "are supported, not %r" % url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self._reader = self._writer = None
+        self._lock = asyncio.Lock()
+
+    async def request(self, method, path, body=None):
+        payload = b"" if body is None else json.dumps(body).encode()
+        head = "\r\n".join([
+            "%s %s HTTP/1.1" % (method, self.prefix + path),
+            "Host: %s:%s" % (self.host, self.port),
+            "Content-Type: application/json;charset=UTF-8",
+            "Content-Length: %s" % len(payload),
+            "Connection: keep-alive", "", ""])
+        async with self._lock:
+            for attempt in (0, 1):
+                if self._writer is None:
+                    self._reader, self._writer = await asyncio.open_connection(
+                        self.host, self.port)
+                try:
+                    self._writer.write(head.encode() + payload)
+                    await self._writer.drain()
+                    return await self._response()
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # the server dropped a kept-alive connection
+                    await self.close()
+                    if attempt:
+                        raise
+
+    async def _response(self):
+        status = await self._reader.readline()
+        if not status:
+            raise ConnectionResetError("Connection closed by the WebDriver")
+        code = int(status.split()[1])
+        headers = {}
+        while True:
+            line = (await self._reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "content-length" in headers:
+            body = await self._reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int((await self._reader.readline()).split(b";")[0], 16)
+                chunk = await self._reader.readexactly(size + 2)
+                if not size:
+                    break
+                body += chunk[:-2]
+        else:
+            body = await self._reader.read()
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return code, json.loads(body.decode() or "null")
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+class session:
+
+    def __init__(self, url, capabilities=None):
+        self.url, self.capabilities = url, capabilities or {}
+        self.connection = connection(url)
+        self.session_id = None
+
+    async def start(self):
+        body = {"capabilities": {"alwaysMatch": self.capabilities}}
+        value = await self.command("POST", "/session", body)
+        self.session_id = value["sessionId"]
+        self.capabilities = value.get("capabilities", self.capabilities)
+        return self
+
+    async def quit(self):
+        try:
+            await self.command("DELETE", "")
+        finally:
+            await self.connection.close()
+            self.session_id = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.quit()
+
+    async def command(self, method, path, body=None):
+        if path != "/session":
+            path = "/session/%s%s" % (self.session_id, path)
+        if body is None and method == "POST":
+            body = {}
+        code, response = await self.connection.request(method, path, body)
+        value = response.get("value") if isinstance(response, dict) else None
+        if code >= 400 or (isinstance(value, dict) and "error" in value):
+            value = value or {}
+            raise WebDriverError(value.get("error", "unknown error"),
+                value.get("message", "HTTP %s" % code))
+        return self._unwrap(value)
+
+    def _wrap(self, value):
+        if isinstance(value, element):
+            return {ELEMENT_KEY: value.id}
+        elif isinstance(value, (list, tuple)):
+            return [self._wrap(v) for v in value]
+        elif isinstance(value, dict):
+            return {k: self._wrap(v) for k, v in value.items()}
+        return value
+
+    def _unwrap(self, value):
+        if isinstance(value, dict):
+            if ELEMENT_KEY in value:
+                return element(self, value[ELEMENT_KEY])
+            return {k: self._unwrap(v) for k, v in value.items()}
+        elif isinstance(value, list):
+            return [self._unwrap(v) for v in value]
+        return value
+
+    async def get(self, url):
+        await self.command("POST", "/url", {"url": url})
+
+    async def current_url(self):
+        return await self.command("GET", "/url")
+
+    async def refresh(self):
+        await self.command("POST", "/refresh")
+
+    async def back(self):
+        await self.command("POST", "/back")
+
+    async def find_element(self, using, value):
+        body = {"using": using, "value": value}
+        return await self.command("POST", "/element", body)
+
+    async def find_elements(self, using, value):
+        body = {"using": using, "value": value}
+        return await self.command("POST", "/elements", body)
+
+    async def execute_script(self, script, *args):
+        body = {"script": script, "args": self._wrap(list(args))}
+        return await self.command("POST", "/execute/sync", body)
+
+    async def execute_async_script(self, script, *args):
+        body = {"script": script, "args": self._wrap(list(args))}
+        return await self.command("POST", "/execute/async", body)
+
+    def __repr__(self):
+        return "session(%r, %r)" % (self.url, self.session_id)
+
+
+class element:
+
+    def __init__(self, session, id):
+        self.session, self.id = session, id
+
+    async def _command(self, method, path, body=None):
+        path = "/element/%s%s" % (self.id, path)
+        return await self.session.command(method, path, body)
+
+    async def find_element(self, using, value):
+        body = {"using": using, "value": value}
+        return await self._command("POST", "/element", body)
+
+    async def find_elements(self, using, value):
+        body = {"using": using, "value": value}
+        return await self._command("POST", "/elements", body)
+
+    async def text(self):
+        return await self._command("GET", "/text")
+
+    async def attribute(self, name):
+        return await self._command("GET", "/attribute/%s" % quote(name))
+
+    async def property(self, name):
+        return await self._command("GET", "/property/%s" % quote(name))
+
+    async def is_enabled(self):
+        return await self._command("GET", "/enabled")
+
+    async def click(self):
+        await self._command("POST", "/click")
+
+    async def clear(self):
+        await self._command("POST", "/clear")
+
+    async def send_keys(self, text):
+        await self._command("POST", "/value", {"text": text, "value": list(text)})
+
+    def __eq__(self, other):
+        return isinstance(other, element) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return "element(%r)" % self.id
+
+
+class Wait(tools.Wait):
+
+    async def until(self, condition, what, default=tools.Wait.DEFAULT,
+            inverse=False, period=None, policy=None):
+        if isinstance(condition, asyncio.Event) and not inverse:
+            try:
+                await asyncio.wait_for(condition.wait(), max(self.timeout, 0))
+            except asyncio.TimeoutError:
+                return self._expire(what, default, inverse, ())
+            else:
+                return True
+        policy = backoff.resolve(policy, period)
+        errors = deque(maxlen=policy.retain)
+        delays = policy.delays()
+        stop = time.monotonic() + self.timeout
+        while True:
+            try:
+                result = condition(*self.args, **self.kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+            except Exception as e:
+                errors.append(e)
+            else:
+                if bool(result) is (not inverse):
+                    return result
+            now = time.monotonic()
+            if now >= stop:
+                return self._expire(what, default, inverse, errors)
+            await asyncio.sleep(min(next(delays), stop - now))
+
+    async def until_is(self, condition, what, default=tools.Wait.DEFAULT,
+            period=None, policy=None):
+        return await self.until(condition, what, default, False, period, policy)
+
+    async def until_is_not(self, condition, what, default=tools.Wait.DEFAULT,
+            period=None, policy=None):
+        return await self.until(condition, what, default, True, period, policy)
+
+
+async def wait(timeout, condition, what, default=Wait.DEFAULT,
+        inverse=False, period=None, policy=None):
+    return await Wait(timeout).until(condition, what, default, inverse, period, policy)
+
+
+class page(structure):
+
+    url = None
+    pattern = None
+    timeout = 15
+    wait_policy = configurable()
+    _memoize = False
+
+    def __init__(self, parent):
+        if isinstance(parent, session):
+            self.session = parent
+        elif isinstance(parent, page):
+            self.session = parent.session
+        else:
+            raise TypeError("The parent of a page "
+                "must be a session or another page")
+        self.parent = parent
+
+    @classmethod
+    async def open(cls, parent):
+        return await cls(parent).get()
+
+    async def get(self):
+        if not self.url:
+            pattern = self.pattern
+            if pattern.startswith("./"):
+                pattern = self.parent.url.rstrip("/") + pattern[1:]
+            await wait(self.timeout, lambda : self._matches(pattern),
+                "to transition to a url matching %r" % pattern,
+                policy=self.wait_policy)
+            self.url = await self.session.current_url()
+        else:
+            if self.url.startswith("./"):
+                self.url = self.parent.url.rstrip("/") + self.url[1:]
+            if await self.session.current_url() != self.url:
+                await self.session.get(self.url)
+        await wait(self.timeout, self.is_loaded, "to load %r" % self.url,
+            policy=self.wait_policy)
+        self._forget_structures()
+        return self
+
+    async def _matches(self, pattern):
+        return re.match(pattern, await self.session.current_url())
+
+    async def element(self):
+        return None
+
+    async def is_loaded(self):
+        return True
+
+    async def refresh(self):
+        await self.session.refresh()
+        self._forget_structures()
+        return self
+
+    def __repr__(self):
+        return type(self).__name__
+
+
+class view(structure):
+
+    selector = ("xpath", ".")
+    _template = None
+    timeout = configurable()
+    wait_policy = configurable()
+
+    def __init_subclass__(cls, **kwargs):
+        if "selector" in cls.__dict__:
+            if not isinstance(cls.selector, tuple):
+                method = ("xpath" if cls.selector[:2]
+                    in XPATH_IDENTIFIERS else "css")
+                cls.selector = (method, cls.selector)
+            cls._template = template(cls.selector[1])
+
+    def __new__(cls, *args, **kwargs):
+        self = new(view, cls, *args, **kwargs)
+        if cls._template is None:
+            return self
+        return partial(self._format, args, kwargs)
+
+    def _format(self, args, kwargs, *a, **kw):
+        method, selector = self.selector
+        self.selector = (method, selector.format(*a, **kw))
+        self.__init__(*args, **kwargs)
+        return self
+
+    def __init__(self, parent):
+        if not isinstance(parent, view) and self.selector == ("xpath", "."):
+            self.selector = ("xpath", "//*")
+        self.session = parent.session
+        self.parent = parent
+        self._element = None
+
+    async def element(self):
+        if self._element is None:
+            what = "%r to be available" % self
+            self._element = await Wait(self.timeout).until(
+                self._new_element, what, policy=self.wait_policy)
+        return self._element
+
+    async def _new_element(self):
+        root = await self.parent.element()
+        finder = self.session if root is None else root
+        return await finder.find_element(*self.selector)
+
+    def refresh(self):
+        self._element = None
+        self._forget_structures()
+        return self
+
+    async def exists(self):
+        try:
+            await self.element()
+        except Timeout:
+            return False
+        else:
+            return True
+
+    async def _call(self, method, *args):
+        try:
+            return await getattr(await self.element(), method)(*args)
+        except WebDriverError as e:
+            if e.error != "stale element reference":
+                raise
+            return await getattr(await self.refresh().element(), method)(*args)
+
+    async def text(self):
+        return await self._call("text")
+
+    async def plain_text(self):
+        clean = (await self.text()).replace("\n", " ").replace("\t", " ")
+        return " ".join(t for t in clean.split(" ") if t)
+
+    async def attr(self, name):
+        return await self._call("attribute", name)
+
+    async def prop(self, name):
+        return await self._call("property", name)
+
+    async def click(self):
+        await self._call("click")
+        return self
+
+    async def send_keys(self, *keys):
+        await self._call("send_keys", "".join(keys))
+        return self
+
+    def __repr__(self):
+        classname, selector = type(self).__name__, self.selector[1]
+        return "%r.%s(%s)" % (self.parent, classname, selector)
+
+
+class container(view):
+
+    holding = "item"
+
+    class item(view):
+        timeout = configurable("item_timeout")
+        selector = "./*[{}]"
+
+    async def items(self):
+        root = await self.element()
+        selector = general_selector(getattr(type(self), self.holding).selector)
+        if selector is not None:
+            items = []
+            for i, e in enumerate(await root.find_elements(*selector), 1):
+                item = self._getitem(i)
+                item._element = e
+                items.append(item)
+            return items
+        items, index = [], 1
+        while True:
+            item = self._getitem(index)
+            if not await item.exists():
+                return items
+            items.append(item)
+            index += 1
+
+    def _getitem(self, x):
+        return getattr(self, self.holding)(x)
+
+    async def __aiter__(self):
+        for item in await self.items():
+            yield item
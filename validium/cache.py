@@ -0,0 +1,64 @@
+from threading import RLock
+from collections import OrderedDict
+
+from .tools import setting
+
+
+class element_cache:
+
+    def __init__(self, size=None):
+        self.size = size
+        self._lock = RLock()
+        self._entries = OrderedDict()
+        self._generations = {}
+
+    def generation(self, session):
+        return self._generations.get(session, 0)
+
+    def invalidate(self, session):
+        with self._lock:
+            self._generations[session] = self.generation(session) + 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            generation, element = entry
+            if generation != self.generation(key[0]):
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return element
+
+    def set(self, key, element):
+        with self._lock:
+            self._entries[key] = (self.generation(key[0]), element)
+            self._entries.move_to_end(key)
+            size = setting("cache_size") if self.size is None else self.size
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] != self.generation(key[0]):
+                return default
+            return entry[1]
+
+    def clear(self, session=None):
+        with self._lock:
+            if session is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == session]:
+                    del self._entries[key]
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+elements = element_cache()
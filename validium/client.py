@@ -1,6 +1,15 @@
+import json
+import time
+import threading
+from inspect import getmembers
+from collections import deque
+from contextlib import contextmanager
 from selenium.webdriver import Remote
 from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
 
+from .errors import *
+from .cache import elements
+
 
 def browser(browser, *args, **kwargs):
     capabilities = getattr(DesiredCapabilities, browser.upper())
@@ -14,3 +23,182 @@ class driver:
         capabilities = {k : v for k, v in getmembers(self) if not k.startswith("_")}
         kwargs.update(desired_capabilities=capabilities)
         return Remote(*args, **kwargs)
+
+
+class pool:
+
+    # reading storage on about:blank throws a SecurityError in some browsers
+    reset_script = ("try { window.localStorage.clear(); } catch (e) {}"
+        "try { window.sessionStorage.clear(); } catch (e) {}")
+
+    def __init__(self, *args, max_size=4, idle_timeout=300, factory=None, **kwargs):
+        self.args, self.kwargs = args, kwargs
+        self.max_size, self.idle_timeout = max_size, idle_timeout
+        self.factory = factory or self._remote
+        self._idle = {}
+        self._busy = {}
+        self._lock = threading.Condition()
+
+    def _remote(self, capabilities):
+        try:
+            from selenium.webdriver.common.options import ArgOptions
+        except ImportError:
+            kwargs = dict(self.kwargs, desired_capabilities=capabilities)
+            return Remote(*self.args, **kwargs)
+        options = ArgOptions()
+        for name, value in capabilities.items():
+            options.set_capability(name, value)
+        return Remote(*self.args, options=options, **self.kwargs)
+
+    @staticmethod
+    def capabilities(capabilities):
+        if isinstance(capabilities, str):
+            capabilities = getattr(DesiredCapabilities, capabilities.upper())
+        return dict(capabilities)
+
+    @staticmethod
+    def _key(capabilities):
+        return json.dumps(capabilities, sort_keys=True, default=str)
+
+    def __len__(self):
+        with self._lock:
+            idle = sum(len(q) for q in self._idle.values())
+            return idle + len(self._busy)
+
+    def warm(self, capabilities, n=1):
+        capabilities = self.capabilities(capabilities)
+        key = self._key(capabilities)
+        for i in range(n):
+            with self._lock:
+                if len(self) >= self.max_size:
+                    break
+                token = self._reserve(key)
+            try:
+                d = self.factory(capabilities)
+            finally:
+                self._release(token)
+            with self._lock:
+                self._idle.setdefault(key, deque()).append((d, time.monotonic()))
+                self._lock.notify()
+        return self
+
+    def checkout(self, capabilities, timeout=None):
+        capabilities = self.capabilities(capabilities)
+        key = self._key(capabilities)
+        stop = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.evict()
+            victim = None
+            with self._lock:
+                idle = self._idle.get(key)
+                d = idle.pop()[0] if idle else None
+                if d is None and len(self) >= self.max_size:
+                    # make room by dropping an idle session with other capabilities
+                    other = next((q for q in self._idle.values() if q), None)
+                    if other is not None:
+                        victim = other.popleft()[0]
+                if d is None and victim is None and len(self) >= self.max_size:
+                    remaining = None if stop is None else stop - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise Timeout("No session with %r became available "
+                            "after %s seconds." % (capabilities, timeout))
+                    self._lock.wait(remaining)
+                    continue
+                token = self._reserve(key)
+            if victim is not None:
+                self._quit(victim)
+            try:
+                if d is not None and not self.healthy(d):
+                    self._quit(d)
+                    d = None
+                if d is None:
+                    d = self.factory(capabilities)
+            except BaseException:
+                self._release(token)
+                raise
+            with self._lock:
+                del self._busy[token]
+                self._busy[d] = key
+            return d
+
+    def _reserve(self, key):
+        token = object()
+        self._busy[token] = key
+        return token
+
+    def _release(self, token):
+        with self._lock:
+            del self._busy[token]
+            self._lock.notify()
+
+    def checkin(self, driver):
+        with self._lock:
+            key = self._busy.pop(driver)
+        try:
+            self.reset(driver)
+        except Exception:
+            self._quit(driver)
+        else:
+            with self._lock:
+                self._idle.setdefault(key, deque()).append((driver, time.monotonic()))
+        with self._lock:
+            self._lock.notify()
+
+    def discard(self, driver):
+        with self._lock:
+            self._busy.pop(driver, None)
+            self._lock.notify()
+        self._quit(driver)
+
+    @contextmanager
+    def session(self, capabilities, timeout=None):
+        d = self.checkout(capabilities, timeout)
+        try:
+            yield d
+        except Exception:
+            if self.healthy(d):
+                self.checkin(d)
+            else:
+                self.discard(d)
+            raise
+        else:
+            self.checkin(d)
+
+    def healthy(self, driver):
+        try:
+            driver.current_url
+        except Exception:
+            return False
+        else:
+            return True
+
+    def reset(self, driver):
+        driver.delete_all_cookies()
+        driver.execute_script(self.reset_script)
+        driver.get("about:blank")
+        elements.invalidate(driver.session_id)
+
+    def evict(self):
+        now, expired = time.monotonic(), []
+        with self._lock:
+            for idle in self._idle.values():
+                while idle and now - idle[0][1] > self.idle_timeout:
+                    expired.append(idle.popleft()[0])
+            if expired:
+                self._lock.notify_all()
+        for d in expired:
+            self._quit(d)
+
+    def close(self):
+        with self._lock:
+            idle = [d for q in self._idle.values() for d, t in q]
+            self._idle.clear()
+        for d in idle:
+            self._quit(d)
+
+    def _quit(self, driver):
+        elements.invalidate(getattr(driver, "session_id", None))
+        try:
+            driver.quit()
+        except Exception:
+            pass
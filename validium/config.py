@@ -1,3 +1,9 @@
 slowdown = 0
 timeout = 200
 item_timeout = 0.2
+cache_size = 1000
+prefetch = 50
+wait_mode = "poll"
+observe_timeout = 20
+wait_policy = None
+profile = "debug"
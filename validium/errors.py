@@ -4,3 +4,26 @@ class ViewError(Exception):
 
 class Timeout(ViewError):
     pass
+
+
+class WebDriverError(ViewError):
+
+    def __init__(self, error, message):
+        super().__init__("%s: %s" % (error, message))
+        self.error, self.message = error, message
+
+
+class FatalError(BaseException):
+    # not an Exception, so the handlers that retry failed conditions let it through
+    pass
+
+
+class ReplayError(FatalError):
+    pass
+
+
+class ActionError(ViewError):
+
+    def __init__(self, message, steps):
+        super().__init__(message)
+        self.steps = steps
@@ -0,0 +1,155 @@
+import time
+from multiprocessing.util import Finalize
+from contextvars import copy_context
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor,
+    FIRST_COMPLETED, wait)
+
+from .errors import *
+
+
+__all__ = ["executor", "outcome"]
+
+
+class outcome:
+
+    def __init__(self, input, value=None, error=None, attempts=0):
+        self.input, self.value = input, value
+        self.error, self.attempts = error, attempts
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def __repr__(self):
+        state = "error=%r" % self.error if self.error else "value=%r" % self.value
+        return "outcome(%r, %s, attempts=%s)" % (self.input, state, self.attempts)
+
+
+def run_flow(page, flow, pool, capabilities, input, retries, control=None):
+    attempts = 0
+    while True:
+        attempts += 1
+        driver = pool.checkout(capabilities)
+        if control is not None:
+            control["driver"] = driver
+        try:
+            value = flow(page(driver), input)
+        except Exception as e:
+            if control is not None and control["cancelled"]:
+                return outcome(input, error=e, attempts=attempts)
+            elif pool.healthy(driver):
+                pool.checkin(driver)
+                return outcome(input, error=e, attempts=attempts)
+            # the session crashed, so the flow gets a fresh one
+            pool.discard(driver)
+            if attempts > retries:
+                return outcome(input, error=e, attempts=attempts)
+        else:
+            if control is None or not control["cancelled"]:
+                pool.checkin(driver)
+            return outcome(input, value, attempts=attempts)
+
+
+_worker_pool = None
+
+
+def _init_worker(factory):
+    global _worker_pool
+    _worker_pool = factory()
+    # worker processes skip atexit, but run finalizers when they exit
+    Finalize(_worker_pool, _worker_pool.close, exitpriority=10)
+
+
+def _run_in_worker(page, flow, capabilities, input, retries):
+    return run_flow(page, flow, _worker_pool, capabilities, input, retries)
+
+
+class executor:
+
+    poll = 0.05
+
+    def __init__(self, page, flow, pool, capabilities, workers=None,
+            timeout=None, retries=1, processes=False):
+        self.page, self.flow, self.pool = page, flow, pool
+        self.capabilities, self.workers = capabilities, workers
+        self.timeout, self.retries = timeout, retries
+        self.processes = processes
+
+    def _executor(self):
+        if self.processes:
+            # each process builds its own pool, so 'pool' is a factory here
+            return ProcessPoolExecutor(self.workers,
+                initializer=_init_worker, initargs=(self.pool,))
+        else:
+            workers = self.workers or getattr(self.pool, "max_size", None)
+            return ThreadPoolExecutor(workers)
+
+    def _submit(self, ex, input):
+        if self.processes:
+            control = None
+            future = ex.submit(_run_in_worker, self.page, self.flow,
+                self.capabilities, input, self.retries)
+        else:
+            control = {"driver": None, "cancelled": False}
+            # flows run with the settings of the code that started them
+            future = ex.submit(copy_context().run, run_flow, self.page, self.flow,
+                self.pool, self.capabilities, input, self.retries, control)
+        return future, control
+
+    def __call__(self, inputs):
+        ex, expired = self._executor(), False
+        try:
+            pending = {}
+            for input in inputs:
+                future, control = self._submit(ex, input)
+                pending[future] = [input, control, None]
+            while pending:
+                done, _ = wait(pending, self._next_wake(pending), FIRST_COMPLETED)
+                for future in done:
+                    input = pending.pop(future)[0]
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        yield outcome(input, error=e)
+                for timeout in self._expire(pending):
+                    expired = True
+                    yield timeout
+        finally:
+            # flows that timed out may still be running, so they aren't waited on
+            ex.shutdown(wait=not (self.processes or expired), cancel_futures=True)
+
+    def _next_wake(self, pending):
+        if self.timeout is None:
+            return None
+        now, wakes = time.monotonic(), []
+        for future, state in pending.items():
+            if state[2] is None and future.running():
+                state[2] = now
+            if state[2] is None:
+                # not started yet, so check again soon
+                wakes.append(self.poll)
+            else:
+                wakes.append(max(state[2] + self.timeout - now, 0))
+        return min(wakes)
+
+    def _expire(self, pending):
+        if self.timeout is None:
+            return
+        now = time.monotonic()
+        for future, (input, control, started) in list(pending.items()):
+            if started is not None and now - started > self.timeout:
+                del pending[future]
+                # a flow in another process can't be interrupted, it only
+                # stops being waited on and finishes in the background
+                if control is not None:
+                    # quitting the session interrupts the flow's next command
+                    control["cancelled"] = True
+                    if control["driver"] is not None:
+                        self.pool.discard(control["driver"])
+                yield outcome(input, error=Timeout("Expects %r to finish "
+                    "after %s seconds." % (input, self.timeout)))
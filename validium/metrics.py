@@ -0,0 +1,143 @@
+import time
+from threading import Lock
+from contextvars import ContextVar
+
+
+__all__ = ["event", "aggregator", "subscribe", "unsubscribe",
+    "attribute", "emit", "timed", "instrument"]
+
+
+hooks = []
+_owner = ContextVar("validium_metrics_owner", default=None)
+
+
+class event:
+
+    __slots__ = ("kind", "name", "duration", "owner")
+
+    def __init__(self, kind, name, duration, owner):
+        self.kind, self.name = kind, name
+        self.duration, self.owner = duration, owner
+
+    @property
+    def lineage(self):
+        return lineage(self.owner)
+
+    def __repr__(self):
+        return "event(%r, %r, %.6f, %r)" % (self.kind,
+            self.name, self.duration, self.lineage)
+
+
+def lineage(owner):
+    if owner is None:
+        return ""
+    names = [type(p).__name__ for p in owner.lineage() if hasattr(p, "lineage")]
+    return ".".join(reversed(names))
+
+
+def subscribe(hook):
+    hooks.append(hook)
+    return hook
+
+
+def unsubscribe(hook):
+    hooks.remove(hook)
+
+
+def emit(kind, name, duration=0.0, owner=None):
+    if hooks:
+        e = event(kind, name, duration, owner or _owner.get())
+        for h in tuple(hooks):
+            h(e)
+
+
+class attribute:
+
+    __slots__ = ("owner", "token")
+
+    def __init__(self, owner):
+        self.owner, self.token = owner, None
+
+    def __enter__(self):
+        if hooks:
+            self.token = _owner.set(self.owner)
+        return self
+
+    def __exit__(self, *exc):
+        if self.token is not None:
+            _owner.reset(self.token)
+            self.token = None
+
+
+class timed:
+
+    __slots__ = ("kind", "name", "start")
+
+    def __init__(self, kind, name):
+        self.kind, self.name, self.start = kind, name, None
+
+    def __enter__(self):
+        if hooks:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            emit(self.kind, self.name, time.perf_counter() - self.start)
+
+
+def instrument(driver):
+    if "_validium_execute" in driver.__dict__:
+        return driver
+    execute = driver._validium_execute = driver.execute
+    def _execute(driver_command, params=None):
+        if not hooks:
+            return execute(driver_command, params)
+        with timed("command", driver_command):
+            return execute(driver_command, params)
+    driver.execute = _execute
+    return driver
+
+
+class aggregator:
+
+    def __init__(self):
+        self._lock = Lock()
+        self.totals = {}
+
+    def __call__(self, event):
+        key = (event.lineage, event.kind, event.name)
+        with self._lock:
+            total = self.totals.setdefault(key, [0, 0.0])
+            total[0] += 1
+            total[1] += event.duration
+
+    def _select(self, kind=None, lineage=None):
+        with self._lock:
+            totals = list(self.totals.items())
+        for (l, k, n), (count, seconds) in totals:
+            if kind is not None and k != kind:
+                continue
+            if lineage is not None and not (l == lineage
+                    or l.startswith(lineage + ".")):
+                continue
+            yield l, k, n, count, seconds
+
+    def count(self, kind=None, lineage=None):
+        return sum(r[3] for r in self._select(kind, lineage))
+
+    def seconds(self, kind=None, lineage=None):
+        return sum(r[4] for r in self._select(kind, lineage))
+
+    def report(self, kind=None, lineage=None):
+        return sorted(self._select(kind, lineage), key=lambda r: -r[4])
+
+    def reset(self):
+        with self._lock:
+            self.totals.clear()
+
+    def __enter__(self):
+        return subscribe(self)
+
+    def __exit__(self, *exc):
+        unsubscribe(self)
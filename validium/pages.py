@@ -1,13 +1,48 @@
 import re
 import time
+import itertools
 from weakref import WeakSet
 from urllib.parse import urljoin
 from contextlib import contextmanager, closing
 from selenium.webdriver import Remote
-
+from selenium.webdriver.remote.command import Command
 
 from .errors import *
 from .tools import *
+from .cache import elements
+from .metrics import attribute, instrument
+
+
+NAVIGATING = {getattr(Command, name) for name in ("GET", "REFRESH", "GO_BACK",
+    "GO_FORWARD", "CLICK_ELEMENT", "SUBMIT_ELEMENT", "SEND_KEYS_TO_ELEMENT",
+    "W3C_ACTIONS", "NEW_WINDOW", "SWITCH_TO_WINDOW", "SWITCH_TO_FRAME",
+    "SWITCH_TO_PARENT_FRAME", "CLOSE") if hasattr(Command, name)}
+
+
+_navigations = itertools.count(1)
+
+
+def track(driver):
+    # commands that can change what the driver shows get a new
+    # navigation generation, so pages know when to check it again
+    if "_validium_navigation" in driver.__dict__:
+        return driver
+    driver._validium_navigation = next(_navigations)
+    execute = driver.execute
+    def _execute(driver_command, params=None):
+        if driver_command in NAVIGATING:
+            navigated(driver)
+        return execute(driver_command, params)
+    driver.execute = _execute
+    return driver
+
+
+def navigated(driver):
+    driver._validium_navigation = next(_navigations)
+
+
+def navigation(driver):
+    return driver.__dict__.get("_validium_navigation")
 
 
 class page(structure):
@@ -16,6 +51,11 @@ class page(structure):
     pattern = None
     timeout = 15
     redirect = None
+    wait_mode = configurable()
+    wait_policy = configurable()
+    _memoize = False
+    _template = None
+    _redirects = ()
     _structure_source = "url"
 
     def __init_subclass__(cls, **kwargs):
@@ -28,17 +68,23 @@ class page(structure):
                 views = import_structures(i, module)
                 for k, v in views.items():
                     setattr(cls, k, v)
+        if "url" in cls.__dict__:
+            cls._template = template(cls.url)
+        if "redirect" in globals():
+            cls._redirects = tuple(name for name in dir(cls)
+                if isinstance(getattr(cls, name), type)
+                and issubclass(getattr(cls, name), redirect))
 
     def __new__(cls, *args, **kwargs):
         self = new(page, cls, *args, **kwargs)
-        if self.url is not None and re.findall(r"[^{]{", self.url):
-            def __format__(*a, **kw):
-                self.url = self.url.format(*a, **kw)
-                self.__init__(*args, **kwargs)
-                return self
-            return __format__
-        else:
+        if cls._template is None:
             return self
+        return partial(self._format, args, kwargs)
+
+    def _format(self, args, kwargs, *a, **kw):
+        self.url = self.url.format(*a, **kw)
+        self.__init__(*args, **kwargs)
+        return self
 
     def __init__(self, parent):
         if not isinstance(parent, (Remote, page)):
@@ -47,12 +93,13 @@ class page(structure):
         else:
             self._children = WeakSet()
             if isinstance(parent, Remote):
-                self.driver = parent
+                self.driver = track(instrument(parent))
             else:
                 self.driver = parent.driver
             if hasattr(parent, "transition_to"):
                 parent.transition_to(self)
             self.parent = parent
+        self._checked = None
         self.transition_from(parent)
         self._get()
 
@@ -70,6 +117,15 @@ class page(structure):
         pass
 
     def _get(self, redirection=True):
+        generation = navigation(self.driver)
+        if not redirection and generation is not None and generation == self._checked:
+            # nothing could have navigated since the last check
+            return
+        with attribute(self):
+            self._load(redirection)
+        self._checked = navigation(self.driver)
+
+    def _load(self, redirection):
         contingent = not self.url or self.url.startswith("./")
         if contingent and not isinstance(self.parent, page):
             raise TypeError("The parent of a page with a contingent url "
@@ -79,25 +135,33 @@ class page(structure):
                 self.pattern = self.parent.url.rstrip("/") + self.pattern[1:]
             elif self.pattern.startswith("\.\/"):
                 self.pattern = "./" + self.pattern[4:]
-            wait(self.timeout, lambda : (re.match(self.pattern, self.current_url)),
+            wait(self.timeout, self._url_condition(self.pattern),
                 "to transition from %r to a url matching %r" %
-                (self.current_url, self.pattern))
+                (self.current_url, self.pattern), policy=self.wait_policy)
             self.url = self.current_url
         else:
             if self.url.startswith("./"):
                 self.url = self.parent.url.rstrip("/") + self.url[1:]
             initial = self.driver.current_url
             if initial != self.url:
-                self.driver.get(self.url)
-                if redirection:
-                    for name in dir(type(self)):
-                        value = getattr(type(self), name)
-                        if inspect.isclass(value) and issubclass(value, redirect):
-                            getattr(self, name).callback()
-                            break
-                wait(self.timeout, lambda : (self.url == self.current_url),
-                    "to transition from %r to %r" % (self.current_url, self.url))
-        wait(self.timeout, self.is_loaded, "to load %r" % self.current_url)
+                self._navigate(self.url)
+                if redirection and self._redirects:
+                    getattr(self, self._redirects[0]).callback()
+                wait(self.timeout, self._url_condition(re.escape(self.url) + "$"),
+                    "to transition from %r to %r" % (self.current_url, self.url),
+                    policy=self.wait_policy)
+        wait(self.timeout, self.is_loaded, "to load %r" % self.current_url,
+            policy=self.wait_policy)
+
+    def _url_condition(self, pattern):
+        if self.wait_mode == "observe":
+            return observe.url(self.driver, pattern)
+        else:
+            return lambda : re.match(pattern, self.current_url)
+
+    def batch(self, actions=False):
+        from .views import batch
+        return batch(self.driver, actions)
 
     @contextmanager
     def window_size(self, x, y):
@@ -129,27 +193,38 @@ class page(structure):
         return self.parent
 
     def get(self, redirection=False):
+        self._checked = None
         self._get(redirection)
+        self._forget_structures()
         for c in self._children:
             c.refresh()
         return self
 
     def refresh(self):
-        self.driver.get(self.current_url)
+        self._navigate(self.current_url)
+        self._forget_structures()
         for c in self._children:
             c.refresh()
         return self
 
     def close(self):
+        elements.invalidate(self.driver.session_id)
         self.driver.close()
 
+    def _navigate(self, url):
+        self.driver.get(url)
+        elements.invalidate(self.driver.session_id)
+
     @classmethod
     @contextmanager
-    def closing(cls, driver):
+    def closing(cls, driver, pool=None):
         try:
             yield cls(driver)
         finally:
-            driver.close()
+            if pool is not None:
+                pool.checkin(driver)
+            else:
+                driver.close()
 
     def sleep(self, t):
         time.sleep(t)
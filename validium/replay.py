@@ -0,0 +1,131 @@
+import gzip
+import json
+import threading
+from selenium.webdriver import Remote
+from selenium.webdriver.remote.command import Command
+
+from .errors import *
+
+
+__all__ = ["capture", "replay", "recorder", "player"]
+
+
+def _open(path, mode):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf8")
+    return open(path, mode, encoding="utf8")
+
+
+def _masked(params):
+    # script arguments like remaining timeouts change from run to run
+    if isinstance(params, dict):
+        return {k: _masked(v) for k, v in params.items()}
+    elif isinstance(params, list):
+        return [_masked(v) for v in params]
+    elif isinstance(params, (int, float)) and not isinstance(params, bool):
+        return 0
+    return params
+
+
+def _comparable(command, params):
+    if command == Command.NEW_SESSION:
+        return None
+    params = dict(params or {})
+    if "args" in params:
+        params["args"] = _masked(params["args"])
+    return json.loads(json.dumps(params, sort_keys=True))
+
+
+class recorder:
+
+    def __init__(self, executor, path):
+        self.executor, self.path = executor, path
+        self._lock = threading.Lock()
+        self._log = _open(path, "w")
+
+    def start(self, session_id, capabilities):
+        # sessions that already exist are replayed from a synthetic start
+        self._write(Command.NEW_SESSION, None, {"status": 0, "value":
+            {"sessionId": session_id, "capabilities": capabilities}})
+
+    def execute(self, command, params):
+        response = self.executor.execute(command, params)
+        self._write(command, params, response)
+        return response
+
+    def _write(self, command, params, response):
+        line = json.dumps([command, params, response], separators=(",", ":"))
+        with self._lock:
+            if not self._log.closed:
+                self._log.write(line + "\n")
+                self._log.flush()
+
+    def close(self):
+        with self._lock:
+            self._log.close()
+        close = getattr(self.executor, "close", None)
+        if close is not None:
+            close()
+
+    def __getattr__(self, name):
+        return getattr(self.executor, name)
+
+
+class player:
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        with _open(path, "r") as log:
+            self._entries = [json.loads(line) for line in log if line.strip()]
+        self._position = 0
+        self._last = None
+
+    def execute(self, command, params):
+        with self._lock:
+            request = (command, _comparable(command, params))
+            if self._position < len(self._entries):
+                entry = self._entries[self._position]
+                if (entry[0], _comparable(entry[0], entry[1])) == request:
+                    self._position += 1
+                    self._last = (request, entry[2])
+                    return entry[2]
+            if self._last is not None and self._last[0] == request:
+                # a poll repeated more often than while recording
+                return self._last[1]
+            raise ReplayError(self._divergence(command, params))
+
+    def _divergence(self, command, params):
+        n = self._position
+        found = "%s(%s)" % (command, json.dumps(params, sort_keys=True, default=str))
+        if n >= len(self._entries):
+            return ("Expects no more than %s commands in %s, but got %s."
+                % (len(self._entries), self.path, found))
+        entry = self._entries[n]
+        expected = "%s(%s)" % (entry[0], json.dumps(entry[1], sort_keys=True))
+        return ("Expects command %s in %s to be %s, but got %s."
+            % (n + 1, self.path, expected, found))
+
+    def close(self):
+        pass
+
+    @property
+    def finished(self):
+        return self._position >= len(self._entries)
+
+
+def capture(driver, path):
+    executor = recorder(driver.command_executor, path)
+    executor.start(driver.session_id, driver.caps)
+    driver.command_executor = executor
+    return driver
+
+
+def replay(path):
+    executor = player(path)
+    try:
+        from selenium.webdriver.common.options import ArgOptions
+    except ImportError:
+        return Remote(command_executor=executor, desired_capabilities={})
+    else:
+        return Remote(command_executor=executor, options=ArgOptions())
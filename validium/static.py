@@ -0,0 +1,260 @@
+import os
+import pkgutil
+import itertools
+from urllib.parse import urljoin, urlsplit
+from urllib.request import url2pathname, pathname2url
+
+from selenium.webdriver import Remote
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.common.exceptions import (WebDriverException,
+    NoSuchElementException, StaleElementReferenceException,
+    InvalidSelectorException)
+
+try:
+    from lxml import etree, html
+except ImportError:  # pragma: no cover
+    etree = html = None
+
+
+__all__ = ["document"]
+
+
+HIDDEN_TAGS = ("script", "style", "template", "noscript", "head")
+
+
+class document(Remote):
+
+    def __init__(self, pages=None, url=None, loader=None):
+        if html is None:
+            raise ImportError("The static document driver requires lxml")
+        self.pages = dict(pages or {})
+        self.loader = loader
+        self.session_id = "static-%x" % id(self)
+        self.caps, self.w3c, self.pinned_scripts = {}, True, {}
+        self.command_executor = None
+        self._is_remote = False
+        self._web_element_cls = WebElement
+        self._ids = itertools.count()
+        self._history = []
+        self._window = {"x": 0, "y": 0, "width": 1024, "height": 768}
+        self._atoms = None
+        try:
+            from selenium.webdriver.remote.locator_converter import LocatorConverter
+        except ImportError:
+            pass
+        else:
+            self.locator_converter = LocatorConverter()
+        self._load("about:blank", "<html><body></body></html>")
+        if url is not None:
+            self.get(url)
+
+    @classmethod
+    def from_file(cls, path):
+        url = urljoin("file:", pathname2url(os.path.abspath(path)))
+        return cls(url=url)
+
+    def quit(self):
+        # there is no browser or connection behind the document to shut down
+        self.execute(Command.QUIT)
+        self.stop_client()
+
+    def _source(self, url):
+        if url in self.pages:
+            return self.pages[url]
+        elif self.loader is not None:
+            return self.loader(url)
+        elif url.startswith("file:"):
+            with open(url2pathname(urlsplit(url).path), "rb") as f:
+                return f.read()
+        raise WebDriverException("No source for %r in the static document" % url)
+
+    def _load(self, url, source):
+        self._url = url
+        self._tree = html.document_fromstring(source).getroottree()
+        self._elements, self._references = {}, {}
+
+    def _reference(self, el):
+        ref = self._references.get(el)
+        if ref is None:
+            ref = self._references[el] = "static-%s" % next(self._ids)
+            self._elements[ref] = el
+        return self.create_web_element(ref)
+
+    def _element(self, ref):
+        if isinstance(ref, WebElement):
+            ref = ref.id
+        try:
+            return self._elements[ref]
+        except KeyError:
+            raise StaleElementReferenceException("%s is no longer "
+                "attached to the static document" % ref)
+
+    def _find(self, context, using, value):
+        try:
+            if using == "xpath":
+                found = context.xpath(value)
+            elif using in ("css selector", "css"):
+                from lxml.cssselect import CSSSelector
+                root = context.getroot() if hasattr(context, "getroot") else context
+                # css matches descendants of an element, but never the element itself
+                found = [el for el in CSSSelector(value, translator="html")(root)
+                    if el is not context]
+            elif using == "tag name":
+                found = context.xpath(".//" + value)
+            elif using in ("link text", "partial link text"):
+                found = [a for a in context.iter("a") if (self._text(a) == value
+                    if using == "link text" else value in self._text(a))]
+            else:
+                raise InvalidSelectorException("Unsupported locator %r" % using)
+        except (etree.XPathError, SyntaxError) as e:
+            raise InvalidSelectorException("%s: %s" % (value, e))
+        if not isinstance(found, list):
+            raise InvalidSelectorException("%r does not select elements" % value)
+        return [el for el in found if isinstance(el, etree.ElementBase)]
+
+    def _text(self, el):
+        if el.tag in HIDDEN_TAGS or el.get("hidden") is not None:
+            return ""
+        parts = [el.text or ""]
+        for child in el:
+            if isinstance(child.tag, str):
+                parts.append(self._text(child))
+            parts.append(child.tail or "")
+        return " ".join("".join(parts).split())
+
+    def _displayed(self, el):
+        for e in itertools.chain([el], el.iterancestors()):
+            if e.tag in HIDDEN_TAGS or e.get("hidden") is not None:
+                return False
+            style = (e.get("style") or "").replace(" ", "")
+            if "display:none" in style or "visibility:hidden" in style:
+                return False
+        return True
+
+    def _property(self, el, name):
+        if name in ("value", "checked", "selected", "disabled"):
+            value = el.get(name)
+            return value if name == "value" else value is not None
+        elif name in ("textContent", "innerText"):
+            return self._text(el)
+        elif name in ("className", "class"):
+            return el.get("class")
+        return el.get(name)
+
+    def _script(self, script, args):
+        args = [self._element(a) if isinstance(a, WebElement) else a for a in args]
+        atoms = self._known_atoms()
+        if atoms.get("getAttribute", script + ".") in script:
+            return args[0].get(args[1])
+        elif atoms.get("isDisplayed", script + ".") in script:
+            return self._displayed(args[0])
+        elif "getBoundingClientRect" in script:
+            return {"x": 0, "y": 0, "width": 0, "height": 0}
+        # there is no javascript engine, so every other script is a no-op
+        return None
+
+    def _known_atoms(self):
+        if self._atoms is None:
+            self._atoms = {}
+            for name in ("getAttribute", "isDisplayed"):
+                try:
+                    atom = pkgutil.get_data("selenium.webdriver.remote",
+                        "%s.js" % name).decode("utf8")
+                except (OSError, TypeError):
+                    continue
+                self._atoms[name] = atom
+        return self._atoms
+
+    def execute(self, driver_command, params=None):
+        params = params or {}
+        handler = self._commands.get(driver_command)
+        if handler is None:
+            raise WebDriverException("%r is not supported by the "
+                "static document driver" % driver_command)
+        return {"value": handler(self, params), "sessionId": self.session_id}
+
+    def _get(self, params):
+        url = urljoin(self._url, params["url"])
+        source = self._source(url)
+        self._history.append(self._url)
+        self._load(url, source)
+
+    def _back(self, params):
+        if self._history:
+            url = self._history.pop()
+            self._load(url, self._source(url) if url != "about:blank"
+                else "<html><body></body></html>")
+
+    def _refresh(self, params):
+        if self._url != "about:blank":
+            self._load(self._url, self._source(self._url))
+
+    def _find_element(self, params):
+        found = self._find_elements(params)
+        if not found:
+            raise NoSuchElementException("Unable to locate element: %s" % params["value"])
+        return found[0]
+
+    def _find_elements(self, params):
+        context = self._element(params["id"]) if "id" in params else self._tree
+        return [self._reference(el) for el in
+            self._find(context, params["using"], params["value"])]
+
+    def _click(self, params):
+        el = self._element(params["id"])
+        for e in itertools.chain([el], el.iterancestors()):
+            if e.tag == "a" and e.get("href"):
+                self._get({"url": e.get("href")})
+                break
+
+    def _send_keys(self, params):
+        el = self._element(params["id"])
+        el.set("value", (el.get("value") or "") + params.get("text", ""))
+
+    def _clear(self, params):
+        self._element(params["id"]).attrib.pop("value", None)
+
+    def _set_window_rect(self, params):
+        self._window.update({k: v for k, v in params.items() if k in self._window})
+        return dict(self._window)
+
+    _commands = {
+        Command.GET: _get,
+        Command.GO_BACK: _back,
+        Command.REFRESH: _refresh,
+        Command.GET_CURRENT_URL: lambda self, p: self._url,
+        Command.GET_TITLE: lambda self, p: self._tree.findtext(".//title") or "",
+        Command.GET_PAGE_SOURCE: lambda self, p: etree.tostring(
+            self._tree, encoding="unicode", method="html"),
+        Command.FIND_ELEMENT: _find_element,
+        Command.FIND_ELEMENTS: _find_elements,
+        Command.FIND_CHILD_ELEMENT: _find_element,
+        Command.FIND_CHILD_ELEMENTS: _find_elements,
+        Command.GET_ELEMENT_TEXT: lambda self, p: self._text(self._element(p["id"])),
+        Command.GET_ELEMENT_TAG_NAME: lambda self, p: self._element(p["id"]).tag,
+        Command.GET_ELEMENT_PROPERTY: lambda self, p: self._property(
+            self._element(p["id"]), p["name"]),
+        Command.IS_ELEMENT_ENABLED: lambda self, p: self._element(
+            p["id"]).get("disabled") is None,
+        Command.IS_ELEMENT_SELECTED: lambda self, p: any(self._element(
+            p["id"]).get(a) is not None for a in ("selected", "checked")),
+        Command.CLICK_ELEMENT: _click,
+        Command.SEND_KEYS_TO_ELEMENT: _send_keys,
+        Command.CLEAR_ELEMENT: _clear,
+        Command.W3C_EXECUTE_SCRIPT: lambda self, p: self._script(p["script"], p["args"]),
+        Command.W3C_EXECUTE_SCRIPT_ASYNC: lambda self, p: self._script(p["script"], p["args"]),
+        Command.GET_WINDOW_RECT: lambda self, p: dict(self._window),
+        Command.SET_WINDOW_RECT: _set_window_rect,
+        Command.CLOSE: lambda self, p: None,
+        Command.QUIT: lambda self, p: None,
+        Command.DELETE_ALL_COOKIES: lambda self, p: None,
+    }
+    # commands that only exist in older selenium releases
+    for _name, _handler in (
+            ("GET_ELEMENT_ATTRIBUTE", lambda self, p: self._element(p["id"]).get(p["name"])),
+            ("IS_ELEMENT_DISPLAYED", lambda self, p: self._displayed(self._element(p["id"]))),
+            ("EXECUTE_SCRIPT", lambda self, p: self._script(p["script"], p["args"]))):
+        if hasattr(Command, _name):
+            _commands[getattr(Command, _name)] = _handler
+    del _name, _handler
@@ -1,10 +1,17 @@
+import re
 import time
+import random
 import inspect
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
 from importlib import import_module
 from weakref import ref
-from functools import wraps
+from string import Formatter
+from functools import wraps, partial
 from .errors import *
 from . import config
+from . import metrics
 
 
 _AttributeError = type("AttributeError", (Exception,), {})
@@ -29,25 +36,85 @@ def import_structures(package, origin=None):
     return views
 
 
+_settings = ContextVar("validium_settings", default={})
+
+
+def setting(key):
+    # context-local overrides win over the module-wide defaults in config
+    settings = _settings.get()
+    if key in settings:
+        return settings[key]
+    return getattr(config, key)
+
+
+@contextmanager
+def configure(**settings):
+    for key in settings:
+        if not hasattr(config, key):
+            raise AttributeError("Unknown setting %r" % key)
+    token = _settings.set(dict(_settings.get(), **settings))
+    try:
+        yield
+    finally:
+        _settings.reset(token)
+
+
 class configurable:
 
     def __init__(self, name=None):
-        if name is not None:
-            self.default = getattr(config, name)
+        self.key = name
 
     def __set_name__(self, cls, name):
-        if not hasattr(self, "default"):
-            self.default = getattr(config, name)
+        if self.key is None:
+            self.key = name
         self.name = name
 
+    @property
+    def default(self):
+        return setting(self.key)
+
     def __get__(self, obj, cls):
-        return (obj or cls).__dict__.setdefault(self.name, self.default)
+        if obj is None or self.name not in obj.__dict__:
+            return self.default
+        return obj.__dict__[self.name]
 
     def __set__(self, obj, value):
         obj.__dict__[self.name] = value
 
     def __delete__(self, obj):
-        obj.__dict__[self.name] = self.default
+        obj.__dict__.pop(self.name, None)
+
+
+class backoff:
+
+    def __init__(self, period=0.01, factor=2, cap=0.5, jitter=0.1, retain=1):
+        self.period, self.factor, self.cap = period, factor, cap
+        self.jitter, self.retain = jitter, retain
+
+    @classmethod
+    def fixed(cls, period):
+        return cls(period, 1, period, 0)
+
+    @classmethod
+    def resolve(cls, policy=None, period=None):
+        if policy is None:
+            if period is not None:
+                return cls.fixed(period)
+            policy = setting("wait_policy")
+        return cls() if policy is None else policy
+
+    def delays(self):
+        delay = self.period
+        while True:
+            if self.jitter:
+                yield delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+            else:
+                yield delay
+            delay = min(delay * self.factor, self.cap)
+
+    def __repr__(self):
+        return "backoff(%r, %r, %r, %r, %r)" % (self.period,
+            self.factor, self.cap, self.jitter, self.retain)
 
 
 class Wait:
@@ -57,73 +124,292 @@ class Wait:
     def __init__(self, timeout, *args, **kwargs):
         self.timeout, self.args, self.kwargs = timeout, args, kwargs
 
-    def until_is(self, condition, what, default=DEFAULT, period=0.2):
-        return self.until(condition, what, default, False, period)
+    def until_is(self, condition, what, default=DEFAULT, period=None, policy=None):
+        return self.until(condition, what, default, False, period, policy)
 
-    def until_is_not(self, condition, what, default=DEFAULT, period=0.2):
-        return self.until(condition, what, default, True, period)
+    def until_is_not(self, condition, what, default=DEFAULT, period=None, policy=None):
+        return self.until(condition, what, default, True, period, policy)
 
-    def until(self, condition, what, default=DEFAULT, inverse=False, period=0.2):
-        errors = []
-        stop = time.time() + self.timeout
+    def until_all(self, conditions, what=None, default=DEFAULT, period=None, policy=None):
+        return self._until_many(conditions, all, what, default, period, policy)
+
+    def until_any(self, conditions, what=None, default=DEFAULT, period=None, policy=None):
+        return self._until_many(conditions, any, what, default, period, policy)
+
+    def _until_many(self, conditions, combine, what, default, period, policy):
+        # every observe condition is checked by one script per driver and
+        # poll, all of them against the same deadline
+        if not isinstance(conditions, dict):
+            conditions = {repr(c): c for c in conditions}
+        policy = backoff.resolve(policy, period)
+        errors = deque(maxlen=policy.retain)
+        delays = policy.delays()
+        stop = time.monotonic() + self.timeout
+        while True:
+            with metrics.timed("check", combine.__name__):
+                values = observe.check_all(conditions, errors, *self.args, **self.kwargs)
+            result = progress(conditions, values)
+            if combine(n in result.values for n in conditions):
+                return result
+            now = time.monotonic()
+            if now >= stop:
+                if what is None:
+                    what = _listing(list(conditions), "and" if combine is all else "or")
+                return self._expire(what, default, False, errors, result.timed_out)
+            delay = min(next(delays), stop - now)
+            metrics.emit("sleep", combine.__name__, delay)
+            time.sleep(delay)
+
+    def until(self, condition, what, default=DEFAULT, inverse=False, period=None, policy=None):
+        if isinstance(condition, observe) and condition.observable:
+            return self._observe(condition, what, default, inverse, period, policy)
+        policy = backoff.resolve(policy, period)
+        errors = deque(maxlen=policy.retain)
+        delays = policy.delays()
+        name = getattr(condition, "__name__", type(condition).__name__)
+        stop = time.monotonic() + self.timeout
         while True:
             try:
-                result = condition(*self.args, **self.kwargs)
+                with metrics.timed("check", name):
+                    result = condition(*self.args, **self.kwargs)
             except Exception as e:
                 errors.append(e)
             else:
+                if isinstance(result, observe) and result.observable:
+                    return self._observe(result, what, default, inverse, period, policy)
                 if bool(result) is (not inverse):
                     return result
-            if time.time() > stop:
-                if default is not Wait.DEFAULT:
-                    return default
+            now = time.monotonic()
+            if now >= stop:
+                return self._expire(what, default, inverse, errors)
+            delay = min(next(delays), stop - now)
+            metrics.emit("sleep", name, delay)
+            time.sleep(delay)
+
+    def _observe(self, condition, what, default, inverse, period=None, policy=None):
+        policy = backoff.resolve(policy, period)
+        errors = deque(maxlen=policy.retain)
+        delays = policy.delays()
+        stop = time.monotonic() + self.timeout
+        while True:
+            expired = False
+            remaining = max(stop - time.monotonic(), 0)
+            try:
+                with metrics.timed("check", "observe"):
+                    done, result = condition.observe(remaining, inverse)
+            except Exception as e:
+                # navigating away aborts the script, so observe the new document
+                errors.append(e)
+                now = time.monotonic()
+                if now < stop:
+                    delay = min(next(delays), stop - now)
+                    metrics.emit("sleep", "observe", delay)
+                    time.sleep(delay)
+            else:
+                if done:
+                    return result
+                elif not condition.observable:
+                    # the driver can't run the observer, so poll instead
+                    return self.until(condition, what, default, inverse, period, policy)
+                expired = remaining <= setting("observe_timeout")
+            if expired or time.monotonic() > stop:
+                return self._expire(what, default, inverse, errors)
+
+    def _expire(self, what, default, inverse, errors, pending=()):
+        if default is not Wait.DEFAULT:
+            return default
+        else:
+            what = what(*self.args, **self.kwargs) if callable(what) else what
+            etype = type(what) if isinstance(what, Exception) else Timeout
+            p1 = "Doesn't expect" if inverse else "Expects"
+            p3 = "after %s seconds." % self.timeout
+            msg = " ".join([p1, what, p3])
+            if pending:
+                msg += " However %s timed out." % _listing(pending, "and")
+            if len(errors):
+                addon = (" One or more %s failures were encountered." if pending
+                    else " However one or more %s failures were encountered.")
+                msg += addon % type(errors[-1]).__name__
+                raise etype(msg) from errors[-1]
+            else:
+                raise etype(msg)
+
+
+def _listing(names, joiner):
+    if len(names) < 3:
+        return (" %s " % joiner).join(names)
+    return "%s %s %s" % (", ".join(names[:-1]), joiner, names[-1])
+
+
+class progress:
+
+    def __init__(self, conditions, values):
+        self.values = values
+        self.met = tuple(n for n in conditions if n in values)
+        self.timed_out = tuple(n for n in conditions if n not in values)
+
+    def __bool__(self):
+        return bool(self.met)
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def __repr__(self):
+        return "progress(met=%r, timed_out=%r)" % (self.met, self.timed_out)
+
+
+class observe:
+
+    observable = True
+
+    def __init__(self, driver, kind, selector=None, root=None, inverse=False, **options):
+        self.driver, self.root, self.inverse = driver, root, inverse
+        self.spec = dict(options, kind=kind)
+        if selector is not None:
+            self.spec["method"], self.spec["selector"] = selector
+
+    @classmethod
+    def present(cls, driver, selector, root=None):
+        return cls(driver, "present", selector, root)
+
+    @classmethod
+    def absent(cls, driver, selector, root=None):
+        return cls(driver, "present", selector, root, inverse=True)
+
+    @classmethod
+    def text(cls, driver, selector, value, root=None, contains=False):
+        return cls(driver, "text", selector, root, value=value, contains=contains)
+
+    @classmethod
+    def attribute(cls, driver, selector, name, value=None, root=None):
+        return cls(driver, "attribute", selector, root, name=name, value=value)
+
+    @classmethod
+    def url(cls, driver, pattern):
+        return cls(driver, "url", pattern=pattern)
+
+    @staticmethod
+    def check_all(conditions, errors, *args, **kwargs):
+        values, batches = {}, {}
+        for name, c in conditions.items():
+            if isinstance(c, observe):
+                batches.setdefault(id(c.driver), []).append((name, c))
+            else:
+                try:
+                    value = c(*args, **kwargs)
+                except Exception as e:
+                    errors.append(e)
+                else:
+                    if value:
+                        values[name] = value
+        for batch in batches.values():
+            driver = batch[0][1].driver
+            roots = [c.root for n, c in batch]
+            specs = [dict(c.spec, inverse=c.inverse) for n, c in batch]
+            script = javascript("select, check, checks",
+                "return checks(arguments[0], arguments[1])")
+            try:
+                checked = driver.execute_script(script, roots, specs)
+            except Exception as e:
+                errors.append(e)
+            else:
+                if not isinstance(checked, list):
+                    # scripts don't run here, so check each one directly
+                    checked = []
+                    for n, c in batch:
+                        try:
+                            value = c()
+                        except Exception as e:
+                            errors.append(e)
+                            value = None
+                        checked.append((bool(value), value))
+                for (name, c), (met, value) in zip(batch, checked):
+                    if met:
+                        values[name] = value if value is not None else True
+        return values
+
+    def observe(self, timeout, inverse=False):
+        timeout = min(timeout, setting("observe_timeout"))
+        spec = dict(self.spec, inverse=inverse != self.inverse)
+        script = javascript("select, check, observe",
+            "observe(arguments[0], arguments[1], arguments[2], arguments[3])")
+        result = self.driver.execute_async_script(
+            script, self.root, spec, int(timeout * 1000))
+        if not isinstance(result, dict):
+            self.observable = False
+            return False, None
+        return result["done"], result["value"]
+
+    def __call__(self, *args, **kwargs):
+        # the check the observer makes, done once through plain commands
+        spec, found = self.spec, None
+        if spec["kind"] == "url":
+            url = self.driver.current_url
+            found = url if re.match("(?:%s)" % spec["pattern"], url) else None
+        else:
+            root = self.driver if self.root is None else self.root
+            for el in root.find_elements(spec["method"], spec["selector"])[:1]:
+                if spec["kind"] == "text":
+                    text = el.text.strip()
+                    if (spec["value"] in text if spec["contains"] else text == spec["value"]):
+                        found = el
+                elif spec["kind"] == "attribute":
+                    value = el.get_dom_attribute(spec["name"])
+                    if (value is not None if spec["value"] is None else value == spec["value"]):
+                        found = el
                 else:
-                    what = what(*self.args, **self.kwargs) if callable(what) else what
-                    etype = type(what) if isinstance(what, Exception) else Timeout
-                    p1 = "Doesn't expect" if inverse else "Expects"
-                    p3 = "after %s seconds." % self.timeout
-                    msg = " ".join([p1, what, p3])
-                    if len(errors):
-                        addon = " However one or more %s failures were encountered."
-                        msg += addon % type(errors[-1]).__name__
-                        raise etype(msg) from errors[-1]
-                    else:
-                        raise etype(msg)
-            time.sleep(period)
-
-
-def wait_until_is(timeout, what=None, default=Wait.DEFAULT, period=0.2):
+                    found = el
+        return (found is None) if self.inverse else found
+
+    def __repr__(self):
+        return "observe(%r)" % self.spec
+
+
+def wait_until_is(timeout, what=None, default=Wait.DEFAULT, period=None, policy=None):
     def setup(method):
         w = what or method.__doc__ or method.__name__.replace("_", " ")
         @wraps(method)
         def wrapper(*args, **kwargs):
             return Wait(timeout, *args, **kwargs
-                ).until_is(method, w, default, period)
+                ).until_is(method, w, default, period, policy)
         return wrapper
     return setup
 
 
-def wait_until_is_not(timout, what=None, default=Wait.DEFAULT, period=0.2):
+def wait_until_is_not(timeout, what=None, default=Wait.DEFAULT, period=None, policy=None):
     def setup(method):
-        w = what or method.__doc__ or method.__name__.split()
+        w = what or method.__doc__ or method.__name__.replace("_", " ")
         @wraps(method)
         def wrapper(*args, **kwargs):
             return Wait(timeout, *args, **kwargs
-                ).until_is_not(method, w, default, period)
+                ).until_is_not(method, w, default, period, policy)
         return wrapper
     return setup
 
 
+def wait(timeout, condition, what, default=Wait.DEFAULT, inverse=False, period=None, policy=None):
+    return Wait(timeout).until(condition, what, default, inverse, period, policy)
 
-def wait(timeout, condition, what, default=Wait.DEFAULT, inverse=False, period=0.2):
-    return Wait(timeout).until(condition, what, default, inverse, period)
+
+def wait_all(timeout, conditions, what=None, default=Wait.DEFAULT, period=None, policy=None):
+    return Wait(timeout).until_all(conditions, what, default, period, policy)
+
+
+def wait_any(timeout, conditions, what=None, default=Wait.DEFAULT, period=None, policy=None):
+    return Wait(timeout).until_any(conditions, what, default, period, policy)
 
 
 class meta_structure(type):
 
     def __get__(des, obj, cls):
         if obj is not None:
-            return des(obj)
+            memo = obj.__dict__.setdefault("_structures", {})
+            child = memo.get(des)
+            if child is None:
+                child = des(obj)
+                if isinstance(child, structure) and child._memoize:
+                    memo[des] = child
+            return child
         else:
             return des
 
@@ -139,9 +425,14 @@ class this:
 
 class structure(metaclass=meta_structure):
 
+    _memoize = True
+
     def __init__(self, parent):
         self.parent = parent
 
+    def _forget_structures(self):
+        self.__dict__.pop("_structures", None)
+
     def lineage(self, index=None, name=None):
         if index is not None:
             if index > 0:
@@ -219,6 +510,18 @@ def new(origin, cls, *args, **kwargs):
         return _new(cls)
 
 
+def template(string):
+    # the replacement fields of a url or selector template, or None if
+    # the string is used as it is
+    if not isinstance(string, str) or "{" not in string:
+        return None
+    try:
+        fields = tuple(f for _, f, _, _ in Formatter().parse(string) if f is not None)
+    except ValueError:
+        return None
+    return fields or None
+
+
 def javascript(functions, script):
     functions = functions.replace(" ", "").split(",")
     context = "\n".join(_javascript[f] for f in functions)
@@ -236,7 +539,183 @@ _javascript = {
           el.dispatchEvent(evObj);
         }
       }
-      """
+      """,
+    "perform": """
+      function perform(steps){
+        function target(t){
+          var el = t.element || (t.steps && locate(t.steps)[0]);
+          if (!el) {
+            throw new Error('no element found');
+          }
+          return el;
+        }
+        function type(el, text){
+          el.focus();
+          for (var i = 0; i < text.length; i++) {
+            var c = text.charAt(i);
+            if (c == '\\ue006' || c == '\\ue007') {
+              if (el.form) {
+                el.form.requestSubmit ? el.form.requestSubmit() : el.form.submit();
+              }
+            } else if (c == '\\ue003') {
+              el.value = el.value.slice(0, -1);
+            } else if (c >= '\\ue000' && c <= '\\uf8ff') {
+              throw new Error('unsupported key ' + c.charCodeAt(0).toString(16));
+            } else {
+              el.value += c;
+            }
+            fireEvent(el, 'input');
+          }
+        }
+        var failed = false;
+        return steps.map(function(step){
+          if (failed) {
+            return false;
+          }
+          try {
+            var el = target(step.target);
+            if (step.action == 'click') {
+              el.click();
+            } else if (step.action == 'keys') {
+              type(el, step.value);
+            } else if (step.action == 'value') {
+              el.value = step.value;
+              fireEvent(el, 'input');
+              fireEvent(el, 'change');
+            } else if (step.action == 'event') {
+              fireEvent(el, step.value);
+            }
+            return null;
+          } catch (e) {
+            failed = true;
+            return String((e && e.message) || e);
+          }
+        });
+      }
+      """,
+    "select": """
+      function select(root, method, selector){
+        var found = [];
+        if (method == 'xpath') {
+          var result = document.evaluate(selector, root, null,
+            XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+          for (var i = 0; i < result.snapshotLength; i++) {
+            found.push(result.snapshotItem(i));
+          }
+        } else {
+          found = Array.prototype.slice.call(root.querySelectorAll(selector));
+        }
+        return found;
+      }
+      """,
+    "locate": """
+      function locate(steps){
+        var node = document;
+        for (var i = 0; i < steps.length; i++) {
+          node = select(node, steps[i][0], steps[i][1])[0];
+          if (!node) {
+            return [];
+          }
+        }
+        return [node];
+      }
+      """,
+    "check": """
+      function check(root, spec){
+        if (spec.kind == 'url') {
+          var href = window.location.href;
+          return new RegExp('^(?:' + spec.pattern + ')').test(href) ? href : null;
+        }
+        var el = select(root || document, spec.method, spec.selector)[0];
+        if (!el) {
+          return null;
+        } else if (spec.kind == 'text') {
+          var text = (el.innerText || '').trim();
+          var found = spec.contains ? text.indexOf(spec.value) >= 0 : text == spec.value;
+          return found ? el : null;
+        } else if (spec.kind == 'attribute') {
+          var value = el.getAttribute(spec.name);
+          var found = spec.value === null ? value !== null : value == spec.value;
+          return found ? el : null;
+        }
+        return el;
+      }
+      """,
+    "checks": """
+      function checks(roots, specs){
+        return specs.map(function(spec, i){
+          var value = null;
+          try { value = check(roots[i], spec); } catch (e) {}
+          return [(!value) == (!!spec.inverse), value];
+        });
+      }
+      """,
+    "observe": """
+      function observe(root, spec, timeout, done){
+        var finished = false, interval = null, timer = null, observer = null;
+        function result(){
+          var value = null;
+          try { value = check(root, spec); } catch (e) {}
+          return (!value) == (!spec.inverse) ? null : {done: true, value: value};
+        }
+        function finish(r){
+          if (finished) return;
+          finished = true;
+          if (observer) observer.disconnect();
+          clearInterval(interval);
+          clearTimeout(timer);
+          document.removeEventListener('readystatechange', test);
+          window.removeEventListener('hashchange', test);
+          window.removeEventListener('popstate', test);
+          done(r);
+        }
+        function test(){
+          var r = result();
+          if (r) finish(r);
+        }
+        var r = result();
+        if (r) return done(r);
+        observer = new MutationObserver(test);
+        observer.observe(document, {childList: true, subtree: true,
+          attributes: true, characterData: true});
+        document.addEventListener('readystatechange', test);
+        window.addEventListener('hashchange', test);
+        window.addEventListener('popstate', test);
+        if (spec.kind == 'url') interval = setInterval(test, 50);
+        timer = setTimeout(function(){ finish({done: false, value: null}); }, timeout);
+      }
+      """,
+    "fingerprint": """
+      function fingerprint(root, spec){
+        return select(root, spec.method, spec.selector).map(function(el){
+          var text = (el.innerText || '').trim();
+          spec.attributes.forEach(function(a){
+            text += '\\u0000' + el.getAttribute(a);
+          });
+          var hash = 5381;
+          for (var i = 0; i < text.length; i++) {
+            hash = ((hash << 5) + hash + text.charCodeAt(i)) | 0;
+          }
+          return hash;
+        });
+      }
+      """,
+    "snapshot": """
+      function snapshot(root, spec){
+        return select(root, spec.method, spec.selector).map(function(el){
+          var attributes = {};
+          spec.attributes.forEach(function(a){
+            attributes[a] = el.getAttribute(a);
+          });
+          var item = spec.recursive ? spec : spec.item;
+          return {
+            text: (el.innerText || '').trim(),
+            attributes: attributes,
+            items: item ? snapshot(el, item) : null
+          };
+        });
+      }
+      """,
 }
 
 def chains(method):
@@ -3,34 +3,128 @@ import sys
 import types
 import inspect
 import logging
+import itertools
+from difflib import SequenceMatcher
+from collections import deque
 from weakref import WeakSet
 from logging import getLogger
 from contextlib import contextmanager
 from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import StaleElementReferenceException
+from selenium.common.exceptions import (StaleElementReferenceException,
+    NoSuchElementException)
 from selenium.webdriver.common.action_chains import ActionChains as Action
 
-from . import config
+from .cache import elements
+from .metrics import attribute, emit
 from .errors import *
 from .tools import *
-from .pages import page
+from .pages import page, navigated, navigation
 
 
-__all__ = ["slowdown", "view", "container", "infinite_container",
-    "mapping", "tree", "button", "menu", "field", "table"]
+__all__ = ["slowdown", "profile", "view", "container", "infinite_container",
+    "mapping", "tree", "button", "menu", "field", "table", "record", "change",
+    "batch"]
 
 
 XPATH_IDENTIFIERS = ("//", "./", "..", "(/", "(.")
+PROFILES = ("debug", "fast")
+XPATH_CHILD_STEP = re.compile(r"^(\./)?[\w\-:*]+$")
+XPATH_INDEX = re.compile(r"^(.*)\[\{0?\}\]$")
 
 
-@contextmanager
 def slowdown(t):
-    hold = config.slowdown
-    config.slowdown = t
-    try:
-        yield
-    finally:
-        config.slowdown = hold
+    return configure(slowdown=t)
+
+
+def profile(name):
+    if name not in PROFILES:
+        raise ValueError("Unknown profile %r, expected one of %r" % (name, PROFILES))
+    return configure(profile=name)
+
+
+def general_selector(selector):
+    # only a single child step or a parenthesized expression
+    # selects the same items as its template does index by index
+    method, selector = selector
+    if method == "xpath":
+        match = XPATH_INDEX.match(selector)
+        if match:
+            base = match.group(1)
+            if "{" not in base and "}" not in base:
+                if XPATH_CHILD_STEP.match(base) or _enclosed(base):
+                    return (method, base)
+
+
+def _enclosed(expression):
+    if not (expression.startswith("(") and expression.endswith(")")):
+        return False
+    depth = 0
+    for i, c in enumerate(expression):
+        depth += {"(": 1, ")": -1}.get(c, 0)
+        if depth == 0 and i != len(expression) - 1:
+            return False
+    return True
+
+
+def compile_locator(v):
+    # the selectors from the page down to a nested view combine into one
+    # locator: xpath chains into a single expression, anything else into
+    # one script that walks the chain in the browser
+    steps = []
+    while isinstance(v, view):
+        if type(v)._find_instance is not view._find_instance:
+            return None
+        steps.append(v.selector)
+        v = v.parent
+    if len(steps) < 2:
+        return None
+    steps.reverse()
+    if any(method != "xpath" for method, selector in steps):
+        return ("chain", tuple(steps))
+    expression = steps[0][1]
+    for method, selector in steps[1:]:
+        expression = _join_xpath(expression, selector)
+        if expression is None:
+            return None
+    return ("xpath", expression)
+
+
+def _join_xpath(parent, selector):
+    if "|" in selector or selector.startswith("(("):
+        return None
+    elif selector.startswith(("/", "(/")):
+        return selector
+    # a child is found below the first element its parent selects
+    anchor = "(%s)[1]" % parent
+    if selector.startswith("("):
+        return "(%s/%s" % (anchor, selector[1:])
+    else:
+        return "%s/%s" % (anchor, selector)
+
+
+def _plain(text):
+    clean = text.replace("\n", " ").replace("\t", " ")
+    return " ".join(t for t in clean.split(" ") if t)
+
+
+def _djb2(text):
+    # the same hash as the fingerprint script, over utf-16 code units
+    code = text.encode("utf-16-le")
+    h = 5381
+    for i in range(0, len(code), 2):
+        h = (h * 33 + int.from_bytes(code[i:i + 2], "little")) & 0xFFFFFFFF
+    return h - (1 << 32) if h & 0x80000000 else h
+
+
+def keystrokes(keys):
+    # ':enter:' style names stand for special keys
+    _keys = []
+    for k in keys:
+        if k.startswith(":") and not k.startswith("::"):
+            if k.endswith(":") and not k.endswith("::"):
+                k = getattr(Keys, k[1:-1].upper())
+        _keys.append(k)
+    return "".join(_keys)
 
 
 def call_string(args, kwargs, form=(lambda i : "%s=%r" % i)):
@@ -43,9 +137,12 @@ class view(structure):
     _structure_source = "selector"
     highlight = "solid 1px red"
     selector = ("xpath", ".")
-    _persistant_instances = {}
+    _template = None
+    profile = None
     timeout = configurable()
     slowdown = configurable()
+    wait_mode = configurable()
+    wait_policy = configurable()
 
     def __init_subclass__(cls, **kwargs):
         if "selector" in cls.__dict__:
@@ -53,6 +150,7 @@ class view(structure):
                 method = ("xpath" if cls.selector[:2]
                     in XPATH_IDENTIFIERS else "css")
                 cls.selector = (method, cls.selector)
+            cls._template = template(cls.selector[1])
         if "imports" in kwargs:
             module = cls.__module__
             imports = kwargs["imports"]
@@ -65,15 +163,15 @@ class view(structure):
 
     def __new__(cls, *args, **kwargs):
         self = new(view, cls, *args, **kwargs)
-        if re.findall(r"[^{]{", self.selector[1]):
-            def __format__(*a, **kw):
-                method, selector = self.selector
-                self.selector = (method, selector.format(*a, **kw))
-                self.__init__(*args, **kwargs)
-                return self
-            return __format__
-        else:
+        if cls._template is None:
             return self
+        return partial(self._format, args, kwargs)
+
+    def _format(self, args, kwargs, *a, **kw):
+        method, selector = self.selector
+        self.selector = (method, selector.format(*a, **kw))
+        self.__init__(*args, **kwargs)
+        return self
 
     def __init__(self, parent):
         if hasattr(parent, "transition_to"):
@@ -88,6 +186,7 @@ class view(structure):
         self.driver = parent.driver
         self._children = WeakSet()
         self.parent = parent
+        self._locator = compile_locator(self)
         self.refresh()
         self.transition_from(parent)
 
@@ -103,6 +202,7 @@ class view(structure):
         if p is not None:
             p._get(redirection=False)
         del self.instance
+        self._forget_structures()
         for c in self._children:
             c.refresh()
 
@@ -120,8 +220,7 @@ class view(structure):
 
     @property
     def plain_text(self):
-        clean = self.text.replace("\n", " ").replace("\t", " ")
-        return " ".join(t for t in clean.split(" ") if t)
+        return _plain(self.text)
 
     @property
     def classes(self):
@@ -134,7 +233,7 @@ class view(structure):
     def exists(self):
         try:
             self.instance
-        except:
+        except Exception:
             return False
         else:
             return True
@@ -153,7 +252,14 @@ class view(structure):
 
     def event(self, etype):
         script = "fireEvent(arguments[0], %r)" % etype
-        return self._js("fireEvent", script, self.instance)
+        try:
+            return self._js("fireEvent", script, self.instance)
+        finally:
+            # handlers of the event may navigate
+            navigated(self.driver)
+
+    def batch(self, actions=False):
+        return batch(self.driver, actions)
 
     @contextmanager
     def window_size(self, x, y):
@@ -186,64 +292,313 @@ class view(structure):
         script = javascript(functions, script)
         return self.driver.execute_script(script, *args)
 
+    @property
+    def _cache_key(self):
+        lineage = tuple(p.selector for p in
+            self.lineage()[1:] if isinstance(p, view))
+        return (self.driver.session_id, lineage, self.selector)
+
     @property
     def instance(self):
-        inst = self._persistant_instances.get(self.selector)
+        inst = elements.get(self._cache_key)
+        if inst is None:
+            with attribute(self):
+                inst = self._resolve()
+        return inst
+
+    def _resolve(self):
+        logger = getLogger(self.__module__)
+        logger.debug("New instance of %s" % self)
+        inst, what = None, "%r to be available" % self
+        if self.wait_mode == "observe":
+            inst = Wait(0, self.parent).until(self._new_instance, what, None)
+            if inst is None:
+                Wait(self.timeout).until(self.present(), what)
         if inst is None:
-            logger = getLogger(self.__module__)
-            logger.debug("New instance of %s" % self)
             wait = Wait(self.timeout, self.parent)
-            inst = wait.until(self._new_instance, "%r to be available" % self)
-            self._persistant_instances[self.selector] = inst
+            inst = wait.until(self._new_instance, what,
+                policy=self.wait_policy)
+        elements.set(self._cache_key, inst)
+        if self._debug:
             inst.location_once_scrolled_into_view
         return inst
 
+    def _observed(self):
+        # observers find the view from its compiled xpath, or below its parent
+        if self._locator is not None and self._locator[0] == "xpath":
+            return self._locator, None
+        elif not isinstance(self.parent, page):
+            return self.selector, self.parent.instance
+        return self.selector, None
+
+    def present(self):
+        selector, root = self._observed()
+        return observe.present(self.driver, selector, root)
+
+    def absent(self):
+        selector, root = self._observed()
+        return observe.absent(self.driver, selector, root)
+
+    def has_text(self, value, contains=False):
+        selector, root = self._observed()
+        return observe.text(self.driver, selector, value, root, contains)
+
+    def has_attribute(self, name, value=None):
+        selector, root = self._observed()
+        return observe.attribute(self.driver, selector, name, value, root)
+
+    @property
+    def _debug(self):
+        return (self.profile or setting("profile")) == "debug"
+
     @instance.deleter
     def instance(self):
-        if self.selector in self._persistant_instances:
-            del self._persistant_instances[self.selector]
+        elements.pop(self._cache_key)
 
     def _new_instance(self, parent):
-        inst = self._find_instance(parent)
-        self._prep_instance(inst)
-        self._persistant_instances[self.selector] = inst
-        if self.exists():
-            return inst
-        else:
-            del self._persistant_instances[self.selector]
+        return self._adopt(self._find_instance(parent))
+
+    def _adopt(self, inst):
+        with attribute(self):
+            self._prep_instance(inst)
+            elements.set(self._cache_key, inst)
+            if self.exists():
+                return inst
+            else:
+                elements.pop(self._cache_key)
 
     def _find_instance(self, parent):
+        if self._locator is not None:
+            inst = self._find_compiled(*self._locator)
+            if inst is not None:
+                return inst
         return parent.find_element(*self.selector)
 
+    def _find_compiled(self, method, selector):
+        if method != "chain":
+            return self.driver.find_element(method, selector)
+        steps = [list(step) for step in selector]
+        found = self._js("select, locate", "return locate(arguments[0])", steps)
+        if not isinstance(found, list):
+            # scripts don't run here, so walk the lineage instead
+            self._locator = None
+        elif found:
+            return found[0]
+        else:
+            raise NoSuchElementException("Unable to locate %r" % self)
+
     def _prep_instance(self, instance):
-        if self.highlight:
+        if self._debug and self.highlight:
             script = 'arguments[0].style.outline = %r' % self.highlight
             self.driver.execute_script(script, instance)
         original_execute = instance._execute
         instance._scroll_into_view_lock = False
         def _execute(*args, **kwargs):
-            cs = call_string(args, kwargs)
-            logging.debug("%s(%s)" % (self, cs))
-            time.sleep(config.slowdown)
+            if self._debug:
+                if logging.getLogger().isEnabledFor(logging.DEBUG):
+                    cs = call_string(args, kwargs)
+                    logging.debug("%s(%s)" % (self, cs))
+                if self.slowdown:
+                    time.sleep(self.slowdown)
             try:
-                return original_execute(*args, **kwargs)
+                with attribute(self):
+                    return original_execute(*args, **kwargs)
             except StaleElementReferenceException:
-                self.refresh().instance
-                raw = self._persistant_instances[self.selector]
+                emit("retry", "stale", owner=self)
+                with attribute(self):
+                    raw = self._recover().instance
                 return raw._execute(*args, **kwargs)
         instance._execute = _execute
 
+    def _recover(self):
+        # only this element and the ancestors it is found through are
+        # re-resolved, everything else keeps its cached element
+        del self.instance
+        if self._locator is None:
+            cached = []
+            for v in self.lineage()[1:]:
+                inst = elements.get(v._cache_key) if isinstance(v, view) else None
+                if inst is not None:
+                    cached.append((v, inst))
+            for v in self._detached(cached):
+                del v.instance
+        return self
+
+    def _detached(self, cached):
+        if not cached:
+            return []
+        script = ("return Array.prototype.map.call(arguments[0], "
+            "function (el) { return !el.isConnected; });")
+        try:
+            detached = self.driver.execute_script(script, [i for v, i in cached])
+        except StaleElementReferenceException:
+            # the driver refuses stale arguments, so any of them may be stale
+            return [v for v, i in cached]
+        if not isinstance(detached, list):
+            return []
+        return [v for (v, i), d in zip(cached, detached) if d]
+
     def __del__(self):
-        inst = self._persistant_instances.get(self.selector)
-        if inst is not None and sys.getrefcount(inst) == 1:
+        try:
+            key = self._cache_key
+            debug = self._debug
+        except Exception:
+            return
+        inst = elements.get(key)
+        if debug and inst is not None and sys.getrefcount(inst) == 1:
             try:
-                inst = self._persistant_instances.pop(self.selector)
+                inst = elements.pop(key)
                 script = 'arguments[0].style.outline = null'
                 self.driver.execute_script(script, inst)
             except:
                 pass
 
 
+NOT_RUN = "not run, an earlier step failed"
+
+
+class step:
+
+    __slots__ = ("action", "view", "value", "error")
+
+    def __init__(self, action, view, value=None):
+        self.action, self.view, self.value = action, view, value
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        state = "" if self.error is None else ", error=%r" % self.error
+        return "step(%r, %s%s)" % (self.action, self.view, state)
+
+
+class batch:
+
+    def __init__(self, driver, actions=False):
+        self.driver, self.actions = driver, actions
+        self.steps = []
+
+    @chains
+    def click(self, view):
+        self.steps.append(step("click", view))
+
+    @chains
+    def send_keys(self, view, *keys, specials=True):
+        # scripts only emulate typing, by appending to the value and firing
+        # input events, so keydown and keyup handlers need actions=True
+        text = keystrokes(keys) if specials else "".join(keys)
+        self.steps.append(step("keys", view, text))
+
+    @chains
+    def set_value(self, view, value):
+        self._scripted("set_value")
+        self.steps.append(step("value", view, value))
+
+    @chains
+    def event(self, view, etype):
+        self._scripted("event")
+        self.steps.append(step("event", view, etype))
+
+    def _scripted(self, name):
+        if self.actions:
+            raise ValueError("%s() can't be sent as W3C actions" % name)
+
+    def run(self):
+        steps, self.steps = self.steps, []
+        if steps:
+            try:
+                if self.actions:
+                    self._perform_actions(steps)
+                elif not self._perform_script(steps):
+                    self._perform_live(steps)
+            finally:
+                navigated(self.driver)
+        failed = [s for s in steps if s.error is not None]
+        if failed:
+            raise ActionError("%s of %s steps failed: %s" % (len(failed), len(steps),
+                "; ".join("%s(%s): %s" % (s.action, s.view, s.error) for s in failed)), steps)
+        return steps
+
+    def _perform_script(self, steps, retry=True):
+        specs = []
+        for s in steps:
+            specs.append({"action": s.action, "value": s.value,
+                "target": self._target(s.view)})
+        script = javascript("fireEvent, select, locate, perform",
+            "return perform(arguments[0])")
+        try:
+            with attribute(steps[0].view):
+                errors = self.driver.execute_script(script, specs)
+        except StaleElementReferenceException:
+            # stale targets are refused before any step runs
+            if not retry:
+                return False
+            emit("retry", "stale", owner=steps[0].view)
+            for s in steps:
+                s.view._recover()
+            return self._perform_script(steps, False)
+        if not isinstance(errors, list):
+            return False
+        for s, e in zip(steps, errors):
+            # false marks the steps skipped after the first failure
+            s.error = NOT_RUN if e is False else e
+        return True
+
+    def _target(self, v):
+        # the browser finds views that aren't resolved yet by itself
+        inst = elements.get(v._cache_key)
+        if inst is not None:
+            return {"element": inst}
+        elif v._locator is not None:
+            method, selector = v._locator
+            steps = selector if method == "chain" else [(method, selector)]
+            return {"steps": [list(s) for s in steps]}
+        elif isinstance(v.parent, page):
+            return {"steps": [list(v.selector)]}
+        return {"element": v.instance}
+
+    def _perform_actions(self, steps):
+        chain = Action(self.driver)
+        try:
+            for s in steps:
+                if s.action == "click":
+                    chain.click(s.view.instance)
+                else:
+                    chain.send_keys_to_element(s.view.instance, s.value)
+            chain.perform()
+        except Exception as e:
+            # the actions are sent together, so they fail together
+            for s in steps:
+                s.error = str(e)
+
+    def _perform_live(self, steps):
+        for i, s in enumerate(steps):
+            try:
+                if s.action == "click":
+                    s.view.instance.click()
+                elif s.action == "keys":
+                    s.view.instance.send_keys(s.value)
+                elif s.action == "value":
+                    s.view.instance.clear()
+                    s.view.instance.send_keys(s.value)
+                else:
+                    s.view.event(s.value)
+            except Exception as e:
+                s.error = str(e)
+                for rest in steps[i + 1:]:
+                    rest.error = NOT_RUN
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, etype, *exc):
+        if etype is None:
+            self.run()
+
+
 class field(view):
 
     @property
@@ -251,15 +606,7 @@ class field(view):
         return self.prop("value")
 
     def send_keys(self, *keys, specials=True):
-        if specials:
-            _keys = []
-            for k in keys:
-                if k.startswith(":") and not k.startswith("::"):
-                    if k.endswith(":") and not k.endswith("::"):
-                        k = getattr(Keys, k[1:-1].upper())
-                _keys.append(k)
-            keys = _keys
-        text = "".join(keys)
+        text = keystrokes(keys) if specials else "".join(keys)
         return self.instance.send_keys(text)
 
     def send_special_keys(self, *keys):
@@ -281,6 +628,8 @@ class button(view):
 class container(view):
 
     holding = "item"
+    batched = True
+    prefetch = configurable()
 
     class item(view):
         timeout = configurable("item_timeout")
@@ -294,82 +643,398 @@ class container(view):
             n += 1
 
     def refresh(self):
-        del self._list
+        self._fingerprints = None
         super().refresh()
+        self._forget()
 
-    @singleton
-    def _list(self):
-        return list(self._iter())
+    def _forget(self):
+        self._loaded, self._pending = [], None
+        self._generation = navigation(self.driver)
+
+    def _current(self):
+        # items read before the driver last navigated or acted may be gone
+        if navigation(self.driver) != self._generation:
+            self._forget()
+
+    def update(self, *attributes):
+        # re-resolves only the items whose text or attributes changed
+        # since the last update, and reports what changed
+        p = self.page
+        if p is not None:
+            p._get(redirection=False)
+        self._generation = navigation(self.driver)
+        fingerprints = self._fingerprint(attributes)
+        if fingerprints is None:
+            return self._live_update(attributes)
+        new = [f for x, f in fingerprints]
+        if self._fingerprints is None:
+            # the first update reads everything, a chunk at a time
+            self._loaded, self._pending = [], None
+            items = self._fill()
+            if len(items) != len(new):
+                return self._live_update(attributes)
+            self._fingerprints = new
+            return [change("inserted", j, item) for j, item in enumerate(items)]
+        old, olds = self._fingerprints, self._fill()
+        # items that moved or changed adopt elements found a chunk at a time
+        element = self._elements()
+        items, changes = [], []
+        matcher = SequenceMatcher(None, old, new, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            for k in range(j2 - j1):
+                x = fingerprints[j1 + k][0]
+                if tag == "equal":
+                    item = self._moved(olds[i1 + k], x, element)
+                else:
+                    item = self._getitem(x, element(x - 1))
+                    kind = "changed" if k < i2 - i1 else "inserted"
+                    changes.append(change(kind, j1 + k, item))
+                if item is None:
+                    # the items changed again while they were read
+                    return self._live_update(attributes)
+                items.append(item)
+            for k in range(j2 - j1, i2 - i1):
+                changes.append(change("removed", i1 + k, olds[i1 + k]))
+        self._loaded, self._pending = items, iter(())
+        self._fingerprints = new
+        return changes
+
+    def _moved(self, item, x, element):
+        method, selector = getattr(type(self), self.holding).selector
+        if item.selector == (method, selector.format(x)):
+            return item
+        return self._getitem(x, element(x - 1))
+
+    def _fingerprint(self, attributes):
+        selector = self._general_selector()
+        if selector is None:
+            return None
+        spec = {"method": selector[0], "selector": selector[1],
+            "attributes": list(attributes)}
+        script = "return fingerprint(arguments[0], arguments[1])"
+        raw = self._js("select, fingerprint", script, self.instance, spec)
+        if not isinstance(raw, list):
+            return None
+        fingerprints = []
+        for i, f in enumerate(raw):
+            window = self._window(i)
+            if window is None:
+                break
+            elif window:
+                fingerprints.append((i + 1, f))
+        return fingerprints
+
+    def _live_update(self, attributes):
+        old, olds = self._fingerprints, list(self._loaded)
+        self.refresh()
+        items = self._fill()
+        new = [self._live_fingerprint(i, attributes) for i in items]
+        changes = []
+        matcher = SequenceMatcher(None, old or [], new, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag != "equal":
+                for k in range(max(i2 - i1, j2 - j1)):
+                    if k >= j2 - j1:
+                        removed = olds[i1 + k] if i1 + k < len(olds) else None
+                        changes.append(change("removed", i1 + k, removed))
+                    else:
+                        kind = "changed" if k < i2 - i1 else "inserted"
+                        changes.append(change(kind, j1 + k, items[j1 + k]))
+        self._fingerprints = new
+        return changes
+
+    @staticmethod
+    def _live_fingerprint(item, attributes):
+        # reads what the fingerprint script reads, so both can be diffed
+        text = item.text.strip()
+        for a in attributes:
+            value = item.instance.get_dom_attribute(a)
+            text += "\0" + ("null" if value is None else str(value))
+        return _djb2(text)
+
+    def _fill(self, n=None):
+        # items are resolved as far as they are asked for, or all of them
+        if self._pending is None:
+            self._pending = self._iter()
+        while n is None or len(self._loaded) < n:
+            v = next(self._pending, None)
+            if v is None:
+                break
+            self._loaded.append(v)
+        return self._loaded
 
     def __getitem__(self, index):
-        return self._list[index]
+        self._current()
+        if isinstance(index, slice):
+            start, stop, step = index.start or 0, index.stop, index.step or 1
+            if start >= 0 and stop is not None and stop >= 0 and step > 0:
+                return self._fill(stop)[index]
+            return self._fill()[index]
+        elif index >= 0:
+            return self._fill(index + 1)[index]
+        else:
+            return self._fill()[index]
 
     def __iter__(self):
-        return iter(self._list)
+        self._current()
+        for i in itertools.count():
+            items = self._fill(i + 1)
+            if i < len(items):
+                yield items[i]
+            else:
+                break
 
     def _iter(self):
         self.instance
-        for x in self.index:
-            v = self._getitem(x)
-            if v is not None:
-                yield v
-            else:
+        element = self._elements()
+        for i, x in enumerate(self.index):
+            window = self._window(i)
+            if window is None:
                 break
+            elif window:
+                if element is None:
+                    v = self._getitem(x)
+                else:
+                    found = element(i)
+                    v = None if found is None else self._getitem(x, found)
+                if v is not None:
+                    yield v
+                else:
+                    break
 
-    def _getitem(self, x):
+    def snapshot(self, *attributes):
+        spec = self._snapshot_spec(attributes)
+        if spec is not None:
+            script = "return snapshot(arguments[0], arguments[1])"
+            raw = self._js("select, snapshot", script, self.instance, spec)
+            if isinstance(raw, list):
+                return self._records(raw)
+        return self._records(self._live_snapshot(attributes), False)
+
+    @classmethod
+    def _snapshot_spec(cls, attributes):
+        holding = getattr(cls, cls.holding)
+        if not (inspect.isclass(holding) and issubclass(holding, view)):
+            return None
+        selector = general_selector(holding.selector)
+        if selector is None:
+            return None
+        spec = {"method": selector[0], "selector": selector[1],
+            "attributes": list(attributes), "recursive": False, "item": None}
+        if holding is cls:
+            spec["recursive"] = True
+        elif issubclass(holding, container):
+            spec["item"] = holding._snapshot_spec(attributes)
+            if spec["item"] is None:
+                return None
+        return spec
+
+    def _live_snapshot(self, attributes):
+        # snapshots read rendered text and markup attributes either way, so
+        # an href is what the markup says rather than the resolved property
+        raw = []
+        for item in self._iter():
+            raw.append({"text": item.text,
+                "attributes": {a: item.instance.get_dom_attribute(a) for a in attributes},
+                "items": (item._live_snapshot(attributes)
+                    if isinstance(item, container) else None)})
+            key = getattr(type(item), "key", None)
+            if key not in (None, mapping.item.key):
+                # custom keys may read anything a live item has
+                raw[-1]["key"] = item.key()
+        return raw
+
+    @classmethod
+    def _records(cls, raw, windowed=True):
+        holding = getattr(cls, cls.holding)
+        nested = issubclass(holding, container)
+        records, kept = [], []
+        for i, r in enumerate(raw):
+            window = cls._window(i) if windowed else True
+            if window is None:
+                break
+            elif window:
+                items = r["items"] or []
+                items = holding._records(items, windowed) if nested else None
+                records.append(record(r["text"], r["attributes"], items))
+                kept.append(r)
+        return cls._collect(records, kept)
+
+    @classmethod
+    def _collect(cls, records, raw):
+        return tuple(records)
+
+    @classmethod
+    def _window(cls, i):
+        return True
+
+    def _elements(self):
+        # elements are found a chunk at a time as the items ask for them
+        selector = self._general_selector()
+        if selector is None:
+            return None
+        method, selector = selector
+        found, done, size = [], [False], self.prefetch
+        def element(i):
+            while i >= len(found) and not done[0]:
+                if size is None:
+                    chunk = self.instance.find_elements(method, selector)
+                    done[0] = True
+                else:
+                    window = "%s[position() > %s and position() <= %s]" % (
+                        selector, len(found), len(found) + size)
+                    chunk = self.instance.find_elements(method, window)
+                    done[0] = len(chunk) < size
+                found.extend(chunk)
+            return found[i] if i < len(found) else None
+        return element
+
+    def _general_selector(self):
+        if self.batched:
+            holding = getattr(type(self), self.holding)
+            if inspect.isclass(holding) and issubclass(holding, view):
+                return general_selector(holding.selector)
+
+    def _getitem(self, x, element=None):
         instance = getattr(self, self.holding)
         if isinstance(instance, view):
             raise TypeError("The selector %r of '%s' is not "
                 "formatable" % (instance.selector[1], instance))
         item = instance(x)
         try:
-            item.instance
+            if element is None or item._adopt(element) is None:
+                item.instance
         except Timeout:
             return None
         else:
             return item
 
 
-class infinite_container(container):
+class change:
 
-    def __getitem__(self, index):
-        if self._is_tail_index(index):
-            return self._get_tail(index)
-        items = iter(self)
-        for x in self.items:
-            try:
-                i = next(items)
-            except StopIteration:
-                raise IndexError("Did not find %r in %s" % (index, self))
-            else:
-                if x == index:
-                    return i
+    __slots__ = ("kind", "index", "item")
 
-    def _get_tail(self, index):
-        return tuple(self)[index]
+    def __init__(self, kind, index, item):
+        self.kind, self.index, self.item = kind, index, item
 
-    def _is_tail_index(self, index):
-        try:
-            return index < 0
-        except:
-            return False
+    def __repr__(self):
+        return "change(%r, %r)" % (self.kind, self.index)
+
+
+class record:
+
+    __slots__ = ("text", "attributes", "contents")
+
+    def __init__(self, text, attributes, contents=None):
+        object.__setattr__(self, "text", text)
+        object.__setattr__(self, "attributes",
+            types.MappingProxyType(dict(attributes)))
+        object.__setattr__(self, "contents", contents)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%r is immutable" % self)
+
+    @property
+    def plain_text(self):
+        return view.plain_text.fget(self)
+
+    @property
+    def classes(self):
+        return view.classes.fget(self)
+
+    def attr(self, name):
+        return self.attributes.get(name)
+
+    def keys(self):
+        return self.contents.keys()
+
+    def values(self):
+        return self.contents.values()
+
+    def items(self):
+        return self.contents.items()
+
+    def __getitem__(self, key):
+        return self.contents[key]
+
+    def __iter__(self):
+        return iter(self.contents)
+
+    def __len__(self):
+        return len(self.contents)
+
+    def __repr__(self):
+        return "record(%r)" % self.text
+
+
+class infinite_container(container):
+
+    patience = 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            # only the tail is kept while the feed streams past
+            tail = deque(self, maxlen=-index)
+            if len(tail) == -index:
+                return tail[0]
+        else:
+            for i, item in enumerate(self):
+                if i == index:
+                    return item
+        raise IndexError("Did not find %r in %s" % (index, self))
 
     def __iter__(self):
-        length = (-1, 0)
-        while length[0] != length[1]:
+        self.instance
+        count, stalls, loaded = 0, 0, False
+        while True:
+            last = None
+            for item in self._since(count):
+                window = self._window(count)
+                count += 1
+                if window is None:
+                    return
+                elif window:
+                    yield item
+                last = item
+            if last is not None:
+                stalls = 0
+                self._scroll_into_view(last.instance)
+            elif loaded:
+                # the feed didn't grow since the last load, and it takes
+                # at least one load to find out
+                stalls += 1
+                if stalls >= max(self.patience, 1):
+                    return
             self.load()
-            Wait(self.timeout).until_not(self.loading, "loading")
-            items = tuple(super().__iter__)
-            last = items[-1].instance()
-            self._scroll_into_view(last)
-            yield from items[length[1]:]
-            length[0], length[1] = length[1], len(items)
+            loaded = True
+            Wait(self.timeout).until_is_not(self.loading, "%r to finish loading" % self)
+
+    def _since(self, count):
+        # only items appended after the first 'count' are resolved
+        elements = self._elements_since(count)
+        for x in itertools.count(count + 1):
+            if elements is None:
+                v = self._getitem(x)
+            elif x - count <= len(elements):
+                v = self._getitem(x, elements[x - count - 1])
+            else:
+                v = None
+            if v is None:
+                break
+            yield v
+
+    def _elements_since(self, count):
+        selector = self._general_selector()
+        if selector is not None:
+            method, selector = selector
+            selector = "%s[position() > %s]" % (selector, count)
+            return self.instance.find_elements(method, selector)
 
     def load(self):
         pass
 
     def loading(self):
-        raise NotImplementedError()
+        return False
 
     def _scroll_into_view(self, v):
         script = "arguments[0].scrollIntoView();"
@@ -396,46 +1061,125 @@ class mapping(container):
     maximum = None
 
     def keys(self):
+        self._current()
+        if self._index is not False:
+            return self._index.keys()
         return self._map.keys()
 
     def values(self):
+        self._current()
         return self._map.values()
 
     def items(self):
+        self._current()
         return self._map.items()
 
-    def refresh(self):
+    def _forget(self):
         del self._map
-        super().refresh()
+        del self._index
+        self._keyed, self._scanned = {}, 0
+        super()._forget()
+
+    def update(self, *attributes):
+        changes = super().update(*attributes)
+        del self._map
+        del self._index
+        self._keyed, self._scanned = {}, 0
+        return changes
 
     @singleton
     def _map(self):
-        return {(x.key() if x.key else i) : x
-            for i, x in enumerate(self._iter())}
+        if self._index is not False:
+            items = self._fill()
+            return {k: items[n] for k, (x, n) in self._index.items() if n < len(items)}
+        self._scan()
+        return dict(self._keyed)
+
+    @singleton
+    def _index(self):
+        # every key read in one script, each pointing at its item's index
+        # and its position among the loaded items, the first of duplicates
+        holding = getattr(type(self), self.holding)
+        if holding.key not in (None, mapping.item.key):
+            return False
+        selector = self._general_selector()
+        if selector is None:
+            return False
+        spec = {"method": selector[0], "selector": selector[1],
+            "attributes": [], "recursive": False, "item": None}
+        script = "return snapshot(arguments[0], arguments[1])"
+        raw = self._js("select, snapshot", script, self.instance, spec)
+        if not isinstance(raw, list):
+            return False
+        index, n = {}, 0
+        for i, r in enumerate(raw):
+            window = self._window(i)
+            if window is None:
+                break
+            elif window:
+                index.setdefault(_plain(r["text"]) if holding.key else n, (i + 1, n))
+                n += 1
+        return index
+
+    def _scan(self, key=None):
+        # keys are read once, resuming where the last scan stopped
+        keyed = self._keyed
+        while key is None or key not in keyed:
+            n = self._scanned
+            if len(self._fill(n + 1)) <= n:
+                return False
+            x = self._loaded[n]
+            keyed.setdefault(x.key() if x.key else n, x)
+            self._scanned = n + 1
+        return True
+
+    def lookup(self, key):
+        # finds one entry, stopping at the first match
+        self._current()
+        built = self.__dict__.get("__map")
+        if built is not None and key in built:
+            return built[key]
+        elif key in self._keyed:
+            return self._keyed[key]
+        elif self._index is not False:
+            if key in self._index:
+                x, n = self._index[key]
+                if n < len(self._loaded):
+                    item = self._loaded[n]
+                else:
+                    item = self._getitem(x)
+                if item is not None:
+                    self._keyed[key] = item
+                    return item
+        elif self._scan(key):
+            return self._keyed[key]
+        raise KeyError(key)
 
     def __getitem__(self, key):
-        return self._map[key]
+        return self.lookup(key)
 
     def __iter__(self):
-        return iter(self._map)
+        return iter(self.keys())
 
-    def _iter(self):
-        self.instance
-        for i, x in enumerate(self.index):
-            if self.minimum is None or self.minimum < i:
-                if self.maximum is None or self.maximum > i:
-                    item = self._getitem(x)
-                    try:
-                        item.instance
-                    except Timeout:
-                        break
-                    else:
-                        yield item
-                else:
-                    break
+    @classmethod
+    def _window(cls, i):
+        if cls.maximum is not None and cls.maximum <= i:
+            return None
+        else:
+            return cls.minimum is None or cls.minimum < i
+
+    @classmethod
+    def _snapshot_spec(cls, attributes):
+        # custom keys are read from live items, so scripts can't snapshot them
+        if getattr(cls, cls.holding).key not in (None, mapping.item.key):
+            return None
+        return super()._snapshot_spec(attributes)
 
-    def _getitem(self, index):
-        return getattr(self, self.holding)(index)
+    @classmethod
+    def _collect(cls, records, raw):
+        key = getattr(cls, cls.holding).key
+        return types.MappingProxyType({(r["key"] if "key" in r else key(x)
+            if key else i) : x for i, (x, r) in enumerate(zip(records, raw))})
 
     class item(container.item):
 
@@ -444,7 +1188,7 @@ class mapping(container):
 
 
 class table(mapping):
-    of = "row"
+    holding = "row"
 
     class row(mapping, mapping.item):
         key = None
@@ -456,13 +1200,24 @@ class table(mapping):
 
 class menu(button, mapping):
 
-    _displayed = False
     always_displayed = False
     initially_displayed = False
 
-    def __init_subclass__(cls, **kwargs):
-        super().__init_subclass__(**kwargs)
-        cls._displayed = cls.initially_displayed
+    @property
+    def _displayed(self):
+        # whether a menu is open belongs to its session, not its class, and
+        # is forgotten with the session's elements when it navigates or resets
+        states = self.driver.__dict__.setdefault("_validium_menus", {})
+        generation, value = states.get(self._cache_key[1:], (None, None))
+        if generation != elements.generation(self.driver.session_id):
+            return self.initially_displayed
+        return value
+
+    @_displayed.setter
+    def _displayed(self, value):
+        states = self.driver.__dict__.setdefault("_validium_menus", {})
+        generation = elements.generation(self.driver.session_id)
+        states[self._cache_key[1:]] = (generation, value)
 
     @chains
     def open(self):
@@ -498,5 +1253,5 @@ class menu(button, mapping):
         def click(self):
             p = self.parent
             if not p.always_displayed and p._displayed:
-                p._enabled = False
+                p._displayed = False
             self.instance.click()